@@ -1,13 +1,566 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
+import argparse
 import csv
+import itertools
 import json
-from datetime import datetime
+import math
+import os
+import random
+import re
+import shlex
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
 
-class EmployeeManager:
-    def __init__(self, filepath, storage_type='csv'):
+# the GUI toolkit and numpy are imported on first use, so the command line
+# starts quickly and runs on machines without a display
+tk = filedialog = messagebox = ttk = ThreadPoolExecutor = None
+np = False  # not imported yet; None once we know it isn't installed
+
+def _load_gui():
+    global tk, filedialog, messagebox, ttk, ThreadPoolExecutor
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, ttk
+    from concurrent.futures import ThreadPoolExecutor
+
+def _numpy():
+    # optional, only used by EmployeeColumns.as_numpy() and PayrollStats
+    global np
+    if np is False:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+    return np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+FIELDS = ['Code', 'Name', 'Salary', 'CreatedAt', 'UpdatedAt']
+# sqlite storage: the employee columns, without the table's id
+_SQL_FIELDS = ', '.join(FIELDS)
+_SQL_INSERT = f'INSERT INTO employees ({_SQL_FIELDS}) VALUES (?, ?, ?, ?, ?)'
+_WS = re.compile(r'[ \t\n\r]*')
+# 'bin' storage: magic, then per record a 4-byte length followed by the
+# utf-8 fields joined with the ASCII unit separator
+_BIN_MAGIC = b'EMP1'
+_BIN_HEADER = struct.Struct('<I')
+_BIN_SEP = '\x1f'
+_EPOCH = datetime(1970, 1, 1)
+_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def _iter_json_array(stream, chunk_size=1 << 16):
+    # decode the objects of a JSON array one by one without reading the
+    # whole stream into memory
+    decoder = json.JSONDecoder()
+    buf, pos, eof, started = '', 0, False, False
+    while True:
+        pos = _WS.match(buf, pos).end()
+        ch = buf[pos:pos + 1]
+        if not started and ch:
+            if ch != '[':
+                raise ValueError('expected a JSON array')
+            started = True
+            pos += 1
+            continue
+        if ch == ',':
+            pos += 1
+            continue
+        if ch == ']':
+            return
+        if ch:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield obj
+                pos = end
+                continue
+        if eof:
+            raise ValueError('unexpected end of JSON array')
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        pos = 0
+
+def _iter_txt(stream):
+    # txt rows are written unquoted with ','.join, so they are split on
+    # every comma rather than parsed as csv
+    keys = next(stream, '').strip().split(',')
+    for line in stream:
+        yield dict(zip(keys, line.strip().split(',')))
+
+def _iter_jsonl(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+def _pack_record(emp):
+    values = [emp[k] for k in FIELDS]
+    if any(_BIN_SEP in v for v in values):
+        raise ValueError('field contains the binary field separator')
+    payload = _BIN_SEP.join(values).encode('utf-8')
+    return _BIN_HEADER.pack(len(payload)) + payload
+
+def _iter_bin(stream, chunk_size=1 << 20):
+    if stream.read(len(_BIN_MAGIC)) != _BIN_MAGIC:
+        raise ValueError('not an employee binary file')
+    size = _BIN_HEADER.size
+    buf, pos = b'', 0
+    while True:
+        chunk = stream.read(chunk_size)
+        buf = buf[pos:] + chunk
+        pos = 0
+        while pos + size <= len(buf):
+            (length,) = _BIN_HEADER.unpack_from(buf, pos)
+            end = pos + size + length
+            if end > len(buf):
+                break
+            yield dict(zip(FIELDS, buf[pos + size:end].decode('utf-8').split(_BIN_SEP)))
+            pos = end
+        if not chunk:
+            return  # a torn record at the very end is ignored
+
+def _write_bin(f, rows, header=True):
+    if header:
+        f.write(_BIN_MAGIC)
+    count = 0
+    for emp in rows:
+        f.write(_pack_record(emp))
+        count += 1
+    return count
+
+def _write_rows(f, rows, fmt):
+    count = 0
+    if fmt == 'jsonl':
+        for emp in rows:
+            f.write(json.dumps(_as_dict(emp), ensure_ascii=False, separators=(',', ':')) + '\n')
+            count += 1
+    elif fmt == 'json':
+        # same layout as json.dump(rows, f, indent=2) but one row at a time
+        f.write('[')
+        for emp in rows:
+            f.write(',\n  ' if count else '\n  ')
+            # flat records, so the C encoder with these separators gives the
+            # same text as indent=2 at a fraction of the cost
+            f.write('{\n    ' + json.dumps(_as_dict(emp), ensure_ascii=False, separators=(',\n    ', ': '))[1:-1] + '\n  }')
+            count += 1
+        f.write('\n]' if count else ']')
+    elif fmt == 'csv':
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for emp in rows:
+            writer.writerow([emp[k] for k in FIELDS])
+            count += 1
+    else:  # txt
+        f.write(','.join(FIELDS) + '\n')
+        for emp in rows:
+            f.write(','.join([emp[k] for k in FIELDS]) + '\n')
+            count += 1
+    return count
+
+def _throughput(count, start):
+    seconds = time.perf_counter() - start
+    return {'rows': count, 'seconds': seconds,
+            'rows_per_sec': count / seconds if seconds else float(count)}
+
+def read_records(stream, fmt='csv'):
+    """Yield employee dicts from an open csv, txt, json, jsonl or (binary) bin stream."""
+    if fmt == 'json':
+        yield from _iter_json_array(stream)
+    elif fmt == 'jsonl':
+        yield from _iter_jsonl(stream)
+    elif fmt == 'bin':
+        yield from _iter_bin(stream)
+    elif fmt == 'txt':
+        yield from _iter_txt(stream)
+    else:
+        yield from csv.DictReader(stream)
+
+def _parse_code(value):
+    return int(value) if value.isdigit() and str(int(value)) == value else value
+
+def _parse_salary(value):
+    if value.isdigit() and str(int(value)) == value:
+        return int(value)
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        return value
+    return number if str(number) == value else value
+
+def _parse_time(value):
+    if len(value) == 19 and value[10] == ' ':
+        try:
+            return int((datetime.fromisoformat(value) - _EPOCH).total_seconds())
+        except ValueError:
+            pass
+    return value
+
+def _format_time(value):
+    return (_EPOCH + timedelta(seconds=value)).strftime(_TIME_FORMAT)
+
+def _as_dict(emp):
+    return emp if isinstance(emp, dict) else emp.to_dict()
+
+class EmployeeRecord:
+    """Compact employee row with typed fields.
+
+    Codes made only of digits are kept as int, salaries as int or Decimal and
+    timestamps as epoch seconds; a value that would not read back the same
+    stays a string. emp['Name'] style access returns the same strings as the
+    dict rows, so a record can stand in for them anywhere in this module.
+    """
+    __slots__ = ('code', 'name', 'salary', 'created_at', 'updated_at')
+    _attrs = dict(zip(FIELDS, __slots__))
+
+    def __init__(self, code, name, salary, created_at, updated_at):
+        self.code = code
+        self.name = name
+        self.salary = salary
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_dict(cls, emp):
+        return cls(_parse_code(emp['Code']), emp['Name'], _parse_salary(emp['Salary']),
+                   _parse_time(emp['CreatedAt']), _parse_time(emp['UpdatedAt']))
+
+    def __getitem__(self, key):
+        value = getattr(self, self._attrs[key])
+        if isinstance(value, str):
+            return value
+        if key in ('CreatedAt', 'UpdatedAt'):
+            return _format_time(value)
+        return str(value)
+
+    def __setitem__(self, key, value):
+        if key == 'Code':
+            value = _parse_code(value)
+        elif key == 'Salary':
+            value = _parse_salary(value)
+        elif key in ('CreatedAt', 'UpdatedAt'):
+            value = _parse_time(value)
+        setattr(self, self._attrs[key], value)
+
+    def keys(self):
+        return FIELDS
+
+    def to_dict(self):
+        return {k: self[k] for k in FIELDS}
+
+class EmployeeColumns:
+    """Column store of a roster for aggregate queries.
+
+    Salaries and timestamps sit in typed arrays at 8 bytes per row; salaries
+    that are not numbers become NaN and unparsed timestamps -1.
+    """
+    def __init__(self, rows=()):
+        self.codes = []
+        self.salaries = array('d')
+        self.created_at = array('q')
+        self.updated_at = array('q')
+        for emp in rows:
+            self.append(emp)
+
+    def append(self, emp):
+        rec = emp if isinstance(emp, EmployeeRecord) else EmployeeRecord.from_dict(emp)
+        self.codes.append(rec.code)
+        self.salaries.append(float('nan') if isinstance(rec.salary, str) else float(rec.salary))
+        self.created_at.append(rec.created_at if isinstance(rec.created_at, int) else -1)
+        self.updated_at.append(rec.updated_at if isinstance(rec.updated_at, int) else -1)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def as_numpy(self):
+        """Zero-copy NumPy views of the numeric columns."""
+        np = _numpy()
+        if np is None:
+            raise RuntimeError('NumPy is not installed')
+        return {'salaries': np.frombuffer(self.salaries, dtype=np.float64),
+                'created_at': np.frombuffer(self.created_at, dtype=np.int64),
+                'updated_at': np.frombuffer(self.updated_at, dtype=np.int64)}
+
+def _salary_value(value):
+    salary = _parse_salary(value)
+    return None if isinstance(salary, str) else float(salary)
+
+_month_cache = {}
+
+def _month_of(created):
+    # 'YYYY-MM' for an epoch second or a CreatedAt string
+    if isinstance(created, str):
+        created = _parse_time(created)
+        if isinstance(created, str):
+            return 'unknown'
+    if created < 0:
+        return 'unknown'
+    day = created // 86400
+    month = _month_cache.get(day)
+    if month is None:
+        month = _month_cache[day] = _format_time(day * 86400)[:7]
+    return month
+
+class PayrollStats:
+    """Salary total, mean, median and percentiles, grouped by code prefix and by
+    CreatedAt month. Built in one pass over EmployeeColumns and kept current
+    with add()/remove().
+    """
+    def __init__(self, prefix_len=1):
+        self.prefix_len = prefix_len
+        self.total = 0.0
+        self._sorted = array('d')
+        self.by_prefix = {}  # prefix -> [count, total]
+        self.by_month = {}   # 'YYYY-MM' -> [count, total]
+
+    @classmethod
+    def from_columns(cls, columns, prefix_len=1):
+        stats = cls(prefix_len)
+        np = _numpy()
+        if np is not None:
+            salaries = columns.as_numpy()['salaries']
+            valid = np.sort(salaries[~np.isnan(salaries)])
+            stats._sorted.frombytes(valid.tobytes())
+            stats.total = float(valid.sum())
+        else:
+            valid = sorted(s for s in columns.salaries if s == s)
+            stats._sorted.extend(valid)
+            stats.total = math.fsum(valid)
+        for code, salary, created in zip(columns.codes, columns.salaries, columns.created_at):
+            if salary == salary:
+                stats._bump(code, created, salary, 1)
+        return stats
+
+    @property
+    def count(self):
+        return len(self._sorted)
+
+    def _bump(self, code, created, salary, sign):
+        for groups, key in ((self.by_prefix, str(code)[:self.prefix_len]),
+                            (self.by_month, _month_of(created))):
+            entry = groups.setdefault(key, [0, 0.0])
+            entry[0] += sign
+            entry[1] += sign * salary
+            if entry[0] == 0:
+                del groups[key]
+
+    def add(self, emp):
+        salary = _salary_value(emp['Salary'])
+        if salary is None:
+            return
+        insort(self._sorted, salary)
+        self.total += salary
+        self._bump(emp['Code'], emp['CreatedAt'], salary, 1)
+
+    def remove(self, emp):
+        salary = _salary_value(emp['Salary'])
+        if salary is None:
+            return
+        i = bisect_left(self._sorted, salary)
+        if i < len(self._sorted) and self._sorted[i] == salary:
+            del self._sorted[i]
+            self.total -= salary
+            self._bump(emp['Code'], emp['CreatedAt'], salary, -1)
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        """Linearly interpolated percentile, p between 0 and 100."""
+        if not self.count:
+            return 0.0
+        k = (self.count - 1) * p / 100
+        lo = int(k)
+        hi = min(lo + 1, self.count - 1)
+        return self._sorted[lo] + (self._sorted[hi] - self._sorted[lo]) * (k - lo)
+
+    def median(self):
+        return self.percentile(50)
+
+    def groups(self, by='prefix'):
+        groups = self.by_prefix if by == 'prefix' else self.by_month
+        return {key: {'count': count, 'total': total, 'mean': total / count}
+                for key, (count, total) in sorted(groups.items())}
+
+    def summary(self):
+        return {'count': self.count, 'total': self.total, 'mean': self.mean(),
+                'median': self.median(), 'p90': self.percentile(90),
+                'by_prefix': self.groups('prefix'), 'by_month': self.groups('month')}
+
+class TrigramIndex:
+    """Inverted index from lowercased 3-character substrings of Code and Name to codes."""
+    def __init__(self, rows=()):
+        self._postings = defaultdict(set)
+        for emp in rows:
+            self.add(emp)
+
+    @classmethod
+    def from_items(cls, items):
+        # (code, emp) pairs; reusing the caller's code strings saves one
+        # string per row when emp is an EmployeeRecord
+        index = cls()
+        for code, emp in items:
+            index.add(emp, code)
+        return index
+
+    @staticmethod
+    def _grams(text):
+        text = text.lower()
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, emp, code=None):
+        code = code or emp['Code']
+        for gram in self._grams(code) | self._grams(emp['Name']):
+            self._postings[gram].add(code)
+
+    def remove(self, emp):
+        # must be called with the record as it was indexed, before editing it
+        for gram in self._grams(emp['Code']) | self._grams(emp['Name']):
+            codes = self._postings.get(gram)
+            if codes is not None:
+                codes.discard(emp['Code'])
+                if not codes:
+                    del self._postings[gram]
+
+    def candidates(self, keyword):
+        """Codes that may contain keyword, or None if it is too short to narrow down."""
+        grams = self._grams(keyword)
+        if not grams:
+            return None
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        result = set(postings[0])
+        for codes in postings[1:]:
+            result &= codes
+            if not result:
+                break
+        return result
+
+class WriteConflict(RuntimeError):
+    """Another process committed to the file between our read and our write."""
+
+class FileLock:
+    """Exclusive advisory lock on a side file shared by every process using the roster.
+
+    The side file also holds a counter that writers bump on each commit, so a
+    reader can tell whether anything was written since it last looked even when
+    mtime and size come out the same. Re-entrant within one instance.
+    """
+    _WIDTH = 20
+    _LOCK_OFFSET = 64  # msvcrt locks are mandatory, keep them off the counter
+
+    def __init__(self, path):
+        self.path = path
+        self.depth = 0
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+        self._mutex = threading.RLock()
+
+    def __enter__(self):
+        self._mutex.acquire()
+        if self.depth == 0:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX)
+                else:
+                    os.lseek(self._fd, self._LOCK_OFFSET, os.SEEK_SET)
+                    while True:
+                        try:
+                            msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:  # LK_LOCK gives up after ~10 seconds
+                            pass
+            except BaseException:
+                self._mutex.release()
+                raise
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self.depth -= 1
+        if self.depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, self._LOCK_OFFSET, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        self._mutex.release()
+
+    def version(self):
+        with self._mutex:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            data = os.read(self._fd, self._WIDTH)
+        return int(data) if data.strip() else 0
+
+    def bump(self):
+        # only called while holding the lock
+        with self._mutex:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            os.write(self._fd, b'%0*d' % (self._WIDTH, self.version() + 1))
+
+    def close(self):
+        os.close(self._fd)
+
+class SharedFile:
+    """Optimistic commits to a file several processes write.
+
+    The manager supplies filepath, shared, retries, _file_lock, _lock,
+    _seen and _file_stat(); _version() is what a commit is checked against.
+    """
+
+    def _version(self):
+        return self._file_lock.version(), self._file_stat()
+
+    def _mark_read(self):
+        # remember which version of the file the caller is about to read
+        if self.shared:
+            self._seen = self._version()
+
+    @contextmanager
+    def _committing(self, check=True):
+        # shared mode: hold the lock file for the write and refuse to commit
+        # on top of data we never saw
+        if not self.shared:
+            yield
+            return
+        with self._lock, self._file_lock:
+            outer = self._file_lock.depth == 1
+            if outer and check and self._version() != self._seen:
+                raise WriteConflict(self.filepath)
+            try:
+                yield
+            finally:
+                if outer:
+                    self._file_lock.bump()
+                    self._seen = self._version()
+
+    def _retrying(self, op, *args):
+        # redo the whole read-modify-write when another process got in first
+        for attempt in range(self.retries):
+            try:
+                return op(*args)
+            except WriteConflict:
+                if attempt == self.retries - 1:
+                    raise
+                time.sleep(random.uniform(0, 0.001 * (attempt + 1)))
+
+class EmployeeManager(SharedFile):
+    def __init__(self, filepath, storage_type='csv', resident=False, flush_interval=None,
+                 journal=False, compact_threshold=1000, compact_records=False,
+                 shared=False, retries=50):
         self.filepath = filepath
-        self.storage_type = storage_type  # 'csv', 'txt', 'json'
+        self.storage_type = storage_type  # 'csv', 'txt', 'json', 'jsonl', 'bin', 'sqlite'
         # initialize file with header or empty structure
         if self.storage_type == 'csv':
             try:
@@ -16,11 +569,11 @@ class EmployeeManager:
             except FileNotFoundError:
                 with open(self.filepath, 'w', newline='', encoding='utf-8') as f:
                     writer = csv.writer(f)
-                    writer.writerow(['Code', 'Name', 'Salary', 'CreatedAt', 'UpdatedAt'])
+                    writer.writerow(FIELDS)
         elif self.storage_type == 'json':
             try:
-                with open(self.filepath, 'r', encoding='utf-8'):
-                    json.load(open(self.filepath, 'r', encoding='utf-8'))
+                with open(self.filepath, 'r', encoding='utf-8') as f:
+                    json.load(f)
             except (FileNotFoundError, json.JSONDecodeError):
                 with open(self.filepath, 'w', encoding='utf-8') as f:
                     json.dump([], f, ensure_ascii=False, indent=2)
@@ -30,12 +583,146 @@ class EmployeeManager:
                     pass
             except FileNotFoundError:
                 with open(self.filepath, 'w', encoding='utf-8') as f:
-                    f.write('Code,Name,Salary,CreatedAt,UpdatedAt\n')
+                    f.write(','.join(FIELDS) + '\n')
+        elif self.storage_type in ('jsonl', 'bin'):
+            if not os.path.exists(self.filepath):
+                with open(self.filepath, 'wb') as f:
+                    if self.storage_type == 'bin':
+                        f.write(_BIN_MAGIC)
+        elif self.storage_type == 'sqlite':
+            self._conn = self._open_db()
+            # the database does its own caching, durability and locking
+            resident = journal = shared = False
+
+        # shared mode: several processes may write the same file. Reads take
+        # no lock; a write takes the lock file only for the commit itself and
+        # is retried from scratch when someone else committed since our read.
+        # A write-behind cache can't be retried that way, so resident mode
+        # logs every change to the journal instead.
+        self.shared = shared
+        self.retries = retries
+        self._file_lock = FileLock(self.filepath + '.lock') if shared else None
+        self._seen = None
+        if shared and resident:
+            journal = True
+
+        # resident mode: the whole roster lives in a dict keyed by Code and
+        # changes are written back in batches by flush(); compact_records=True keeps
+        # it as EmployeeRecord objects instead of dicts
+        self.resident = resident
+        self.compact_records = compact_records
+        self.flush_interval = flush_interval
+        self._cache = None
+        self._index = None
+        self._generation = 0
+        self._stats = None
+        self._stats_at = None
+        self._stat = None
+        self._dirty = False
+        self._timer = None
+        self._lock = threading.RLock()
+
+        # journal mode: changes are appended to <file>.log and folded into
+        # the main file by compact() once the log gets long
+        self.journal = journal
+        self.journal_path = self.filepath + '.log'
+        self.compact_threshold = compact_threshold
+        self._journal_len = 0
+        # a log left by an earlier journal session is folded in whatever
+        # this session's mode, so it is never replayed over newer rows
+        if self.storage_type != 'sqlite' and os.path.exists(self.journal_path):
+            self._fold_journal()
+
+        if self.resident:
+            self._load()
+
+    def _open_db(self):
+        conn = sqlite3.connect(self.filepath, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # the search index is keyed on id: VACUUM may renumber the implicit
+        # rowid of a table without an INTEGER PRIMARY KEY
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(employees)')]
+        migrate = bool(columns) and 'id' not in columns
+        if migrate:
+            conn.executescript('''
+                DROP TABLE IF EXISTS employees_fts;
+                DROP TRIGGER IF EXISTS employees_ai;
+                DROP TRIGGER IF EXISTS employees_ad;
+                DROP TRIGGER IF EXISTS employees_au;
+                ALTER TABLE employees RENAME TO employees_old;
+            ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS employees (
+                id INTEGER PRIMARY KEY,
+                Code TEXT NOT NULL UNIQUE,
+                Name TEXT NOT NULL,
+                Salary TEXT NOT NULL,
+                CreatedAt TEXT NOT NULL,
+                UpdatedAt TEXT NOT NULL
+            )
+        ''')
+        if migrate:
+            conn.execute(f'INSERT INTO employees ({_SQL_FIELDS}) '
+                         f'SELECT {_SQL_FIELDS} FROM employees_old ORDER BY rowid')
+            conn.execute('DROP TABLE employees_old')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_employees_name ON employees (Name)')
+        # trigram FTS index behind search(); fall back to LIKE when the
+        # sqlite build has no FTS5
+        try:
+            conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS employees_fts USING fts5(
+                    Code, Name, content='employees', content_rowid='id', tokenize='trigram'
+                )
+            ''')
+            conn.executescript('''
+                CREATE TRIGGER IF NOT EXISTS employees_ai AFTER INSERT ON employees BEGIN
+                    INSERT INTO employees_fts (rowid, Code, Name) VALUES (new.id, new.Code, new.Name);
+                END;
+                CREATE TRIGGER IF NOT EXISTS employees_ad AFTER DELETE ON employees BEGIN
+                    INSERT INTO employees_fts (employees_fts, rowid, Code, Name)
+                    VALUES ('delete', old.id, old.Code, old.Name);
+                END;
+                CREATE TRIGGER IF NOT EXISTS employees_au AFTER UPDATE ON employees BEGIN
+                    INSERT INTO employees_fts (employees_fts, rowid, Code, Name)
+                    VALUES ('delete', old.id, old.Code, old.Name);
+                    INSERT INTO employees_fts (rowid, Code, Name) VALUES (new.id, new.Code, new.Name);
+                END;
+            ''')
+            if migrate:
+                conn.execute("INSERT INTO employees_fts (employees_fts) VALUES ('rebuild')")
+            self._fts = True
+        except sqlite3.OperationalError:
+            self._fts = False
+        conn.commit()
+        return conn
 
     def _current_time(self):
         return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-    def get_all(self):
+    def _file_stat(self):
+        st = os.stat(self.filepath)
+        stat = (st.st_mtime_ns, st.st_size)
+        if self.journal:
+            try:
+                st = os.stat(self.journal_path)
+                stat += (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                pass
+        return stat
+
+    def _disk_stamp(self):
+        # what the resident cache compares against to spot outside writes
+        return self._version() if self.shared else self._file_stat()
+
+    def _loaded_stamp(self):
+        # in shared mode, the version as of our last read or commit rather
+        # than whatever another process may have written since
+        return self._seen if self.shared else self._file_stat()
+
+    def _read_file(self):
+        self._mark_read()
+        if self.storage_type in ('jsonl', 'bin'):
+            return list(self._iter_file())
         if self.storage_type == 'csv':
             with open(self.filepath, 'r', newline='', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
@@ -45,102 +732,709 @@ class EmployeeManager:
                 return json.load(f)
         else:  # txt
             with open(self.filepath, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            keys = lines[0].strip().split(',')
-            data = []
-            for line in lines[1:]:
-                parts = line.strip().split(',')
-                data.append({k: v for k, v in zip(keys, parts)})
+                return list(_iter_txt(f))
+
+    def _iter_file(self):
+        self._mark_read()
+        if self.storage_type == 'json':
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                yield from _iter_json_array(f)
+        elif self.storage_type == 'jsonl':
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                yield from _iter_jsonl(f)
+        elif self.storage_type == 'bin':
+            with open(self.filepath, 'rb') as f:
+                yield from _iter_bin(f)
+        elif self.storage_type == 'txt':
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                yield from _iter_txt(f)
+        else:  # csv
+            with open(self.filepath, 'r', newline='', encoding='utf-8') as f:
+                yield from csv.DictReader(f)
+
+    def _write_file(self, data):
+        # write to a temp file and rename it over the original so a crash
+        # never leaves a half-written roster behind
+        tmp_path = self.filepath + '.tmp'
+        with self._committing():
+            if self.storage_type == 'bin':
+                with open(tmp_path, 'wb') as f:
+                    _write_bin(f, data)
+            else:
+                newline = '' if self.storage_type == 'csv' else None
+                with open(tmp_path, 'w', newline=newline, encoding='utf-8') as f:
+                    _write_rows(f, data, self.storage_type)
+            os.replace(tmp_path, self.filepath)
+
+    def _read_journal(self):
+        entries = []
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break  # torn last line from a crash
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _append_journal(self, op, emp):
+        self._append_journal_many(op, [emp])
+
+    def _append_journal_many(self, op, emps):
+        with self._committing():
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                for emp in emps:
+                    f.write(json.dumps({'op': op, 'emp': _as_dict(emp)}, ensure_ascii=False) + '\n')
+                    self._journal_len += 1
+            if self._journal_len >= self.compact_threshold:
+                self.compact()
+
+    def _read_all(self):
+        data = self._read_file()
+        return self._merge_journal(data) if self.journal else data
+
+    def _merge_journal(self, data):
+        entries = self._read_journal()
+        self._journal_len = len(entries)
+        if not entries:
             return data
+        merged = {emp['Code']: emp for emp in data}
+        for entry in entries:
+            if entry['op'] == 'put':
+                merged[entry['emp']['Code']] = entry['emp']
+            else:
+                merged.pop(entry['emp']['Code'], None)
+        return list(merged.values())
+
+    def compact(self):
+        """Fold the journal into the main file."""
+        if not self.journal:
+            return
+        # in shared mode the file is read under the lock, except for the
+        # resident cache which was read earlier
+        with self._lock, self._committing(check=self.resident):
+            data = list(self._cache.values()) if self.resident else self._read_all()
+            self._write_file(data)
+            self._drop_journal()
+        if self.resident:
+            self._stat = self._loaded_stamp()
+
+    def _fold_journal(self):
+        # like compact(), but from the file and the log rather than the
+        # cache, which may be missing or not yet loaded
+        with self._lock, self._committing(check=False):
+            self._write_file(self._merge_journal(self._read_file()))
+            self._drop_journal()
+
+    def _drop_journal(self):
+        # replaying a stale log after a crash here is harmless: puts
+        # carry whole records and deletes are idempotent
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+        self._journal_len = 0
+
+    def _wrap(self, emp):
+        return EmployeeRecord.from_dict(emp) if self.compact_records else emp
+
+    def _load(self):
+        rows = self._read_all() if self.journal else self._iter_file()
+        self._cache = {emp['Code']: self._wrap(emp) for emp in rows}
+        self._generation += 1
+        self._index = TrigramIndex.from_items(self._cache.items())
+        self._stat = self._loaded_stamp()
+        self._dirty = False
+
+    def _sync(self):
+        # pick up edits made to the file by someone else; pending local
+        # changes win and will overwrite them on the next flush
+        if not self._dirty and self._disk_stamp() != self._stat:
+            self._load()
+
+    def _record_change(self, op, emp):
+        # resident mode: log the change right away or leave it for flush()
+        if self.journal:
+            self._append_journal(op, emp)
+            self._stat = self._loaded_stamp()
+        else:
+            self._mark_dirty()
+
+    def _mark_dirty(self):
+        self._dirty = True
+        if self.flush_interval and self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write pending resident-mode changes to disk."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self.resident or not self._dirty:
+                return
+            self._write_file(list(self._cache.values()))
+            self._stat = self._loaded_stamp()
+            self._dirty = False
+
+    def close(self):
+        self.flush()
+        if self.journal:
+            self._fold_journal()
+        if self.storage_type == 'sqlite':
+            self._conn.close()
+        if self._file_lock is not None:
+            self._file_lock.close()
+
+    def get_all(self):
+        if self.storage_type == 'sqlite':
+            return [dict(row) for row in self._conn.execute(f'SELECT {_SQL_FIELDS} FROM employees')]
+        if self.resident:
+            with self._lock:
+                self._sync()
+                return list(self._cache.values())
+        return self._read_all()
+
+    def iter_all(self):
+        """Yield employees one at a time without loading the whole file."""
+        if self.storage_type == 'sqlite':
+            for row in self._conn.execute(f'SELECT {_SQL_FIELDS} FROM employees'):
+                yield dict(row)
+        elif self.resident or (self.journal and os.path.exists(self.journal_path)):
+            yield from self.get_all()
+        else:
+            yield from self._iter_file()
+
+    def records(self):
+        """Yield every employee as a compact EmployeeRecord."""
+        for emp in self.iter_all():
+            yield emp if isinstance(emp, EmployeeRecord) else EmployeeRecord.from_dict(emp)
+
+    def columns(self):
+        """Load salaries and timestamps into an EmployeeColumns store."""
+        return EmployeeColumns(self.records())
+
+    def get(self, code):
+        """Return the employee with this code, or None."""
+        if self.storage_type == 'sqlite':
+            row = self._conn.execute(f'SELECT {_SQL_FIELDS} FROM employees WHERE Code = ?', (code,)).fetchone()
+            return dict(row) if row else None
+        if self.resident:
+            with self._lock:
+                self._sync()
+                return self._cache.get(code)
+        return next((emp for emp in self.iter_all() if emp['Code'] == code), None)
 
     def exists(self, code):
-        return any(emp['Code'] == code for emp in self.get_all())
+        if self.storage_type == 'sqlite':
+            return self._conn.execute('SELECT 1 FROM employees WHERE Code = ?', (code,)).fetchone() is not None
+        if self.resident:
+            with self._lock:
+                self._sync()
+                return code in self._cache
+        return any(emp['Code'] == code for emp in self.iter_all())
 
-    def add(self, code, name, salary):
+    def _add(self, code, name, salary):
         if self.exists(code):
-            return False
+            return None
         now = self._current_time()
         record = {'Code': code, 'Name': name, 'Salary': salary, 'CreatedAt': now, 'UpdatedAt': now}
-        if self.storage_type == 'csv':
-            with open(self.filepath, 'a', newline='', encoding='utf-8') as f:
+        if self.resident:
+            record = self._wrap(record)
+        if self.storage_type == 'sqlite':
+            with self._conn:
+                self._conn.execute(_SQL_INSERT, (code, name, salary, now, now))
+        elif self.resident:
+            with self._lock:
+                self._cache[code] = record
+                self._index.add(record, code)
+                self._record_change('put', record)
+        elif self.journal:
+            self._append_journal('put', record)
+        elif self.storage_type == 'csv':
+            with self._committing(), open(self.filepath, 'a', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
                 writer.writerow(record.values())
         elif self.storage_type == 'json':
             data = self.get_all()
             data.append(record)
-            with open(self.filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        else:  # txt
-            with open(self.filepath, 'a', encoding='utf-8') as f:
+            self._write_file(data)
+        elif self.storage_type == 'txt':
+            with self._committing(), open(self.filepath, 'a', encoding='utf-8') as f:
                 f.write(','.join(record.values()) + '\n')
+        else:  # jsonl, bin
+            self._append_many([record])
+        return record
+
+    def _stats_stamp(self):
+        return self._generation if self.resident else self._file_stat()
+
+    def _snapshot(self, code):
+        # the fields PayrollStats needs, copied before a write changes them
+        if self._stats is None:
+            return None
+        emp = self.get(code)
+        return emp and {'Code': emp['Code'], 'Salary': emp['Salary'], 'CreatedAt': emp['CreatedAt']}
+
+    def _track(self, before, old, new):
+        # apply our own change to the running payroll aggregates; if the data
+        # changed some other way since they were built, drop them instead
+        if self._stats is None:
+            return
+        if before != self._stats_at:
+            self._stats = None
+            return
+        if old is not None:
+            self._stats.remove(old)
+        if new is not None:
+            self._stats.add(new)
+        self._stats_at = self._stats_stamp()
+
+    def payroll_stats(self, prefix_len=1):
+        """PayrollStats for the roster, rebuilt only when the data changed outside this manager."""
+        with self._lock:
+            if self.resident:
+                self._sync()
+            stamp = self._stats_stamp()
+            if self._stats is None or self._stats_at != stamp or self._stats.prefix_len != prefix_len:
+                self._stats = PayrollStats.from_columns(self.columns(), prefix_len)
+                self._stats_at = stamp
+            return self._stats
+
+    def add(self, code, name, salary):
+        before = self._stats_stamp()
+        record = self._retrying(self._add, code, name, salary)
+        if record is None:
+            return False
+        self._track(before, None, record)
+        return True
+
+    def update(self, code, name, salary):
+        before = self._stats_stamp()
+        old = self._snapshot(code)
+        if not self._retrying(self._update, code, name, salary):
+            return False
+        if old is not None:
+            self._track(before, old, dict(old, Salary=salary or old['Salary']))
+        return True
+
+    def delete(self, code):
+        before = self._stats_stamp()
+        old = self._snapshot(code)
+        if not self._retrying(self._delete, code):
+            return False
+        self._track(before, old, None)
         return True
 
     def search(self, keyword):
-        return [emp for emp in self.get_all()
-                if keyword.lower() in emp['Code'].lower() or keyword.lower() in emp['Name'].lower()]
+        if self.storage_type == 'sqlite':
+            # trigrams need at least three characters
+            if self._fts and len(keyword) >= 3:
+                rows = self._conn.execute(f'''
+                    SELECT {', '.join('e.' + k for k in FIELDS)}
+                    FROM employees_fts f JOIN employees e ON e.id = f.rowid
+                    WHERE employees_fts MATCH ?
+                ''', ('"' + keyword.replace('"', '""') + '"',))
+            else:
+                pattern = '%' + keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                rows = self._conn.execute(rf'''
+                    SELECT {_SQL_FIELDS} FROM employees WHERE Code LIKE ? ESCAPE '\' OR Name LIKE ? ESCAPE '\'
+                ''', (pattern, pattern))
+            return [dict(row) for row in rows]
+        keyword = keyword.lower()
+        if self.resident:
+            # narrow down with the trigram index, then confirm the substring
+            with self._lock:
+                self._sync()
+                codes = self._index.candidates(keyword)
+                rows = self._cache.values() if codes is None else [self._cache[c] for c in codes]
+                return [emp for emp in rows
+                        if keyword in emp['Code'].lower() or keyword in emp['Name'].lower()]
+        return [emp for emp in self.iter_all()
+                if keyword in emp['Code'].lower() or keyword in emp['Name'].lower()]
 
-    def update(self, code, name, salary):
+    def _new_record(self, rec, now):
+        return {'Code': str(rec['Code']), 'Name': rec['Name'], 'Salary': str(rec['Salary']),
+                'CreatedAt': rec.get('CreatedAt') or now, 'UpdatedAt': rec.get('UpdatedAt') or now}
+
+    def _merge_record(self, emp, rec, now):
+        if emp is None:
+            return self._new_record(rec, now)
+        emp['Name'] = rec.get('Name') or emp['Name']
+        emp['Salary'] = str(rec.get('Salary') or '') or emp['Salary']
+        emp['UpdatedAt'] = now
+        return emp
+
+    def _append_many(self, rows):
+        if self.storage_type == 'sqlite':
+            with self._conn:
+                self._conn.executemany(f'INSERT OR IGNORE INTO employees ({_SQL_FIELDS}) VALUES (?, ?, ?, ?, ?)',
+                                       ([emp[k] for k in FIELDS] for emp in rows))
+        elif self.resident:
+            with self._lock:
+                rows = [self._wrap(emp) for emp in rows]
+                for emp in rows:
+                    code = emp['Code']
+                    self._cache[code] = emp
+                    self._index.add(emp, code)
+                if self.journal:
+                    self._append_journal_many('put', rows)
+                    self._stat = self._loaded_stamp()
+                elif rows:
+                    self._mark_dirty()
+        elif self.journal:
+            self._append_journal_many('put', rows)
+        elif self.storage_type == 'csv':
+            with self._committing(), open(self.filepath, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                for emp in rows:
+                    writer.writerow([emp[k] for k in FIELDS])
+        elif self.storage_type == 'txt':
+            with self._committing(), open(self.filepath, 'a', encoding='utf-8') as f:
+                for emp in rows:
+                    f.write(','.join([emp[k] for k in FIELDS]) + '\n')
+        elif self.storage_type == 'jsonl':
+            with self._committing(), open(self.filepath, 'a', encoding='utf-8') as f:
+                _write_rows(f, rows, 'jsonl')
+        elif self.storage_type == 'bin':
+            with self._committing(), open(self.filepath, 'ab') as f:
+                _write_bin(f, rows, header=False)
+        else:  # json has no append, copy the old rows and the new ones in one pass
+            self._write_file(itertools.chain(self.iter_all(), rows))
+
+    def add_many(self, records):
+        """Add employees from an iterable of dicts, skipping existing codes.
+
+        Returns a dict with the number of rows added and rows per second.
+        """
+        start = time.perf_counter()
+        if self.shared:
+            records = list(records)  # a retry has to see them again
+        added = self._retrying(self._add_many, records)
+        self._stats = None
+        return _throughput(added, start)
+
+    def _add_many(self, records):
+        seen = {emp['Code'] for emp in self.iter_all()}
+        added = 0
+        now = self._current_time()
+
+        def fresh():
+            nonlocal added
+            for rec in records:
+                code = str(rec['Code'])
+                if code in seen:
+                    continue
+                seen.add(code)
+                added += 1
+                yield self._new_record(rec, now)
+
+        self._append_many(fresh())
+        return added
+
+    def upsert_many(self, records):
+        """Update employees that exist and add the rest, in a single write."""
+        start = time.perf_counter()
+        pending = {}
+        for rec in records:
+            pending[str(rec['Code'])] = rec
+        count = len(pending)
+        self._retrying(self._upsert_many, pending)
+        self._stats = None
+        return _throughput(count, start)
+
+    def _upsert_many(self, pending):
+        now = self._current_time()
+        pending = dict(pending)  # merged() consumes it
+        if self.storage_type == 'sqlite':
+            existing = {row[0] for row in self._conn.execute(
+                'SELECT Code FROM employees WHERE Code IN (SELECT value FROM json_each(?))',
+                (json.dumps(list(pending)),))}
+
+            def params():
+                for code, rec in pending.items():
+                    if code in existing:
+                        # like _merge_record: a missing or blank field keeps the stored one
+                        yield [code, rec.get('Name') or '', str(rec.get('Salary') or ''), now, now]
+                    else:
+                        emp = self._new_record(rec, now)
+                        yield [emp[k] for k in FIELDS]
+            with self._conn:
+                self._conn.executemany(_SQL_INSERT + '''
+                    ON CONFLICT (Code) DO UPDATE SET
+                        Name = COALESCE(NULLIF(excluded.Name, ''), Name),
+                        Salary = COALESCE(NULLIF(excluded.Salary, ''), Salary),
+                        UpdatedAt = excluded.UpdatedAt
+                ''', params())
+        elif self.resident:
+            with self._lock:
+                self._sync()
+                changed = []
+                for code, rec in pending.items():
+                    emp = self._cache.get(code)
+                    if emp is None:
+                        emp = self._wrap(self._new_record(rec, now))
+                    else:
+                        self._index.remove(emp)
+                        emp = self._merge_record(emp, rec, now)
+                    self._cache[code] = emp
+                    self._index.add(emp, code)
+                    changed.append(emp)
+                if self.journal:
+                    self._append_journal_many('put', changed)
+                    self._stat = self._loaded_stamp()
+                elif changed:
+                    self._mark_dirty()
+        elif self.journal:
+            current = {emp['Code']: emp for emp in self.get_all()}
+            self._append_journal_many('put', [self._merge_record(current.get(code), rec, now)
+                                              for code, rec in pending.items()])
+        else:
+            def merged():
+                for emp in self.iter_all():
+                    rec = pending.pop(emp['Code'], None)
+                    yield emp if rec is None else self._merge_record(emp, rec, now)
+                for rec in pending.values():
+                    yield self._new_record(rec, now)
+            # the rows are read under the lock while they are written
+            with self._committing(check=False):
+                self._write_file(merged())
+
+    def export(self, stream, fmt='csv'):
+        """Stream every employee to an open stream as csv, txt, json, jsonl or bin.
+
+        'bin' needs a binary stream, the other formats a text stream.
+        """
+        start = time.perf_counter()
+        if fmt == 'bin':
+            count = _write_bin(stream, self.iter_all())
+        else:
+            count = _write_rows(stream, self.iter_all(), fmt)
+        return _throughput(count, start)
+
+    def _update(self, code, name, salary):
+        now = self._current_time()
+        if self.storage_type == 'sqlite':
+            with self._conn:
+                cur = self._conn.execute('''
+                    UPDATE employees SET Name = COALESCE(NULLIF(?, ''), Name),
+                        Salary = COALESCE(NULLIF(?, ''), Salary), UpdatedAt = ?
+                    WHERE Code = ?
+                ''', (name, salary, now, code))
+            return cur.rowcount > 0
+        if self.resident:
+            with self._lock:
+                self._sync()
+                emp = self._cache.get(code)
+                if emp is None:
+                    return False
+                self._index.remove(emp)
+                emp['Name'] = name or emp['Name']
+                emp['Salary'] = salary or emp['Salary']
+                emp['UpdatedAt'] = now
+                self._index.add(emp, code)
+                self._record_change('put', emp)
+                return True
         updated = False
         data = self.get_all()
-        now = self._current_time()
         for emp in data:
             if emp['Code'] == code:
                 emp['Name'] = name or emp['Name']
                 emp['Salary'] = salary or emp['Salary']
                 emp['UpdatedAt'] = now
                 updated = True
+                if self.journal:
+                    self._append_journal('put', emp)
         if not updated:
             return False
-        # write back
-        if self.storage_type == 'csv' or self.storage_type == 'txt':
-            with open(self.filepath, 'w', newline='', encoding='utf-8') as f:
-                if self.storage_type == 'csv':
-                    writer = csv.writer(f)
-                    writer.writerow(['Code', 'Name', 'Salary', 'CreatedAt', 'UpdatedAt'])
-                else:
-                    f.write('Code,Name,Salary,CreatedAt,UpdatedAt\n')
-                for emp in data:
-                    f.write(','.join([emp['Code'], emp['Name'], emp['Salary'], emp['CreatedAt'], emp['UpdatedAt']]) + '\n')
-        else:  # json
-            with open(self.filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+        if not self.journal:
+            self._write_file(data)
         return True
 
-    def delete(self, code):
-        removed = False
+    def _delete(self, code):
+        if self.storage_type == 'sqlite':
+            with self._conn:
+                cur = self._conn.execute('DELETE FROM employees WHERE Code = ?', (code,))
+            return cur.rowcount > 0
+        if self.resident:
+            with self._lock:
+                self._sync()
+                emp = self._cache.pop(code, None)
+                if emp is None:
+                    return False
+                self._index.remove(emp)
+                self._record_change('del', {'Code': code})
+                return True
         data = self.get_all()
         new_data = [emp for emp in data if emp['Code'] != code]
         removed = len(new_data) != len(data)
-        # write back
-        if self.storage_type == 'csv' or self.storage_type == 'txt':
-            with open(self.filepath, 'w', newline='', encoding='utf-8') as f:
-                if self.storage_type == 'csv':
-                    writer = csv.writer(f)
-                    writer.writerow(['Code', 'Name', 'Salary', 'CreatedAt', 'UpdatedAt'])
-                else:
-                    f.write('Code,Name,Salary,CreatedAt,UpdatedAt\n')
-                for emp in new_data:
-                    f.write(','.join([emp['Code'], emp['Name'], emp['Salary'], emp['CreatedAt'], emp['UpdatedAt']]) + '\n')
+        if not removed:
+            return False
+        if self.journal:
+            self._append_journal('del', {'Code': code})
+        else:
+            self._write_file(new_data)
+        return True
+
+class TreePaging:
+    """Treeview paging for the employee apps.
+
+    The app supplies self.tree, self.scrollbar, _row_values(emp) and
+    show_all(); rows that aren't dicts override _row_code.
+    """
+    PAGE_SIZE = 200
+
+    def _init_paging(self):
+        self._rows = []
+        self._positions = {}
+        self._iids = {}
+        self._shown = 0
+        self._showing_all = False
+
+    def _row_code(self, emp):
+        return emp['Code']
+
+    def _on_tree_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # page in more rows once the view gets near the bottom
+        if float(last) > 0.9 and self._shown < len(self._rows):
+            self._load_page()
+
+    def _load_page(self):
+        end = min(self._shown + self.PAGE_SIZE, len(self._rows))
+        for emp in self._rows[self._shown:end]:
+            if emp is not None:
+                self._iids[self._row_code(emp)] = self.tree.insert('', 'end', values=self._row_values(emp))
+        self._shown = end
+
+    def refresh_tree(self, rows, showing_all=False):
+        # only the first page is materialized, the rest comes in on scroll
+        self.tree.delete(*self.tree.get_children())
+        self._rows = list(rows)
+        self._positions = {self._row_code(emp): i for i, emp in enumerate(self._rows)}
+        self._iids = {}
+        self._shown = 0
+        self._showing_all = showing_all
+        self._load_page()
+
+    def _tree_put(self, emp):
+        # patch a single row instead of rebuilding the whole table
+        if not self._showing_all:
+            self.show_all()
+            return
+        code = self._row_code(emp)
+        pos = self._positions.get(code)
+        if pos is None:
+            self._positions[code] = len(self._rows)
+            self._rows.append(emp)
+            if self._shown == len(self._rows) - 1:
+                self._load_page()
+            return
+        self._rows[pos] = emp
+        iid = self._iids.get(code)
+        if iid is not None:
+            self.tree.item(iid, values=self._row_values(emp))
+
+    def _tree_remove(self, code):
+        if not self._showing_all:
+            self.show_all()
+            return
+        pos = self._positions.pop(code, None)
+        if pos is None:
+            return
+        self._rows[pos] = None  # keep the other positions valid
+        iid = self._iids.pop(code, None)
+        if iid is not None:
+            self.tree.delete(iid)
+
+class BackgroundWork:
+    """The window's worker thread and the busy indicator.
+
+    The app supplies self.root, self.progress and self.manager.
+    """
+
+    def _init_worker(self):
+        _load_gui()
+        # file work runs on one worker thread (so operations keep their
+        # order) and results come back to the Tk thread via root.after
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = deque()
+        self._polling = False
+        self._dropped = set()
+
+    def _run(self, func, *args, on_done=None):
+        """Run func(*args) on the worker thread and pass its result to on_done on the Tk thread."""
+        future = self.executor.submit(func, *args)
+        self._pending.append((future, on_done))
+        if not self._polling:
+            self._polling = True
+            self.progress.start(10)
+            self.root.after(50, self._poll)
+        return future
+
+    def _poll(self):
+        # hand results back in the order the operations were started
+        while self._pending and self._pending[0][0].done():
+            future, on_done = self._pending.popleft()
+            if future.cancelled() or future in self._dropped:
+                self._dropped.discard(future)
+                continue
+            error = future.exception()
+            if error is not None:
+                messagebox.showerror("خطا", str(error))
+            elif on_done is not None:
+                on_done(future.result())
+        if self._pending:
+            self.root.after(50, self._poll)
         else:
-            with open(self.filepath, 'w', encoding='utf-8') as f:
-                json.dump(new_data, f, ensure_ascii=False, indent=2)
-        return removed
+            self._polling = False
+            self.progress.stop()
+
+    def cancel(self):
+        # queued operations are dropped; one that is already running
+        # finishes, but its result is ignored
+        for future, _ in self._pending:
+            if not future.cancel():
+                self._dropped.add(future)
+
+    def on_close(self):
+        # let queued writes finish before flushing and closing the file
+        self.executor.shutdown(wait=True)
+        if self.manager:
+            self.manager.close()
+        self.root.destroy()
 
-class EmployeeApp:
+class EmployeeApp(TreePaging, BackgroundWork):
     def __init__(self, root):
+        _load_gui()
         self.root = root
         self.root.title("مدیریت کارکنان")
         self.root.geometry("800x550")
         self.manager = None
+        self._init_worker()
 
         # انتخاب نوع ذخیره‌سازی
         top_frame = tk.Frame(root, bg='#e0f7fa', pady=5)
         top_frame.pack(fill='x')
         tk.Label(top_frame, text="نوع فایل:", bg='#e0f7fa').pack(side='left', padx=5)
         self.storage_var = tk.StringVar(value='csv')
-        for fmt in ['csv', 'txt', 'json']:
+        for fmt in ['csv', 'txt', 'json', 'jsonl', 'bin', 'sqlite']:
             tk.Radiobutton(top_frame, text=fmt.upper(), variable=self.storage_var,
                            value=fmt, bg='#e0f7fa').pack(side='left', padx=5)
+        self.resident_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(top_frame, text="نگهداری در حافظه", variable=self.resident_var,
+                       bg='#e0f7fa').pack(side='left', padx=5)
+        self.journal_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(top_frame, text="ژورنال", variable=self.journal_var,
+                       bg='#e0f7fa').pack(side='left', padx=5)
+        tk.Button(top_frame, text="لغو", command=self.cancel).pack(side='right', padx=5)
+        self.progress = ttk.Progressbar(top_frame, mode='indeterminate', length=120)
+        self.progress.pack(side='right', padx=5)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # فیلدهای ورودی
         frame = tk.Frame(root, bg='#e1f5fe', padx=10, pady=10)
@@ -164,27 +1458,47 @@ class EmployeeApp:
         tk.Button(btn_frame, text="جستجو", command=self.search, bg='#014b72', fg='white').pack(side='left', padx=5)
         tk.Button(btn_frame, text="به‌روزرسانی", command=self.update, bg='#013440', fg='white').pack(side='left', padx=5)
         tk.Button(btn_frame, text="حذف", command=self.delete, bg='#b71c1c', fg='white').pack(side='left', padx=5)
+        tk.Button(btn_frame, text="ورود گروهی", command=self.import_file, bg='#00695c', fg='white').pack(side='left', padx=5)
+        tk.Button(btn_frame, text="خروجی", command=self.export_file, bg='#004d40', fg='white').pack(side='left', padx=5)
+        tk.Button(btn_frame, text="آمار حقوق", command=self.show_stats, bg='#4a148c', fg='white').pack(side='left', padx=5)
 
         # جدول نمایش
-        self.tree = ttk.Treeview(root, columns=('Code','Name','Salary','CreatedAt','UpdatedAt'), show='headings')
+        tree_frame = tk.Frame(root)
+        tree_frame.pack(fill='both', expand=True, padx=10, pady=10)
+        self.tree = ttk.Treeview(tree_frame, columns=('Code','Name','Salary','CreatedAt','UpdatedAt'), show='headings')
         for col in self.tree['columns']:
             self.tree.heading(col, text=col)
             self.tree.column(col, width=100)
-        self.tree.pack(fill='both', expand=True, padx=10, pady=10)
+        self.scrollbar = ttk.Scrollbar(tree_frame, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
+        self.scrollbar.pack(side='right', fill='y')
+        self.tree.pack(side='left', fill='both', expand=True)
+        self._init_paging()
 
     def select_file(self):
         ext = self.storage_var.get()
         filetypes = [(f"{ext.upper()} files", f"*.{ext}")]
         path = filedialog.asksaveasfilename(defaultextension=f'.{ext}', filetypes=filetypes)
         if path:
-            self.manager = EmployeeManager(path, storage_type=ext)
-            messagebox.showinfo("فایل انتخاب شد", f"مسیر فایل:\n{path}")
+            old = self.manager
+            self.manager = None
+            resident, journal = self.resident_var.get(), self.journal_var.get()
 
-    def refresh_tree(self, rows):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        for emp in rows:
-            self.tree.insert('', 'end', values=(emp['Code'], emp['Name'], emp['Salary'], emp['CreatedAt'], emp['UpdatedAt']))
+            def open_manager():
+                if old:
+                    old.close()
+                # other clerks may have the same file open
+                return EmployeeManager(path, storage_type=ext, resident=resident,
+                                       flush_interval=2, journal=journal, shared=True)
+
+            def done(manager):
+                self.manager = manager
+                messagebox.showinfo("فایل انتخاب شد", f"مسیر فایل:\n{path}")
+
+            self._run(open_manager, on_done=done)
+
+    def _row_values(self, emp):
+        return (emp['Code'], emp['Name'], emp['Salary'], emp['CreatedAt'], emp['UpdatedAt'])
 
     def add(self):
         if not self.manager: return
@@ -192,18 +1506,25 @@ class EmployeeApp:
         name = self.name_entry.get().strip()
         salary = self.salary_entry.get().strip()
         if code and name and salary:
-            if self.manager.add(code, name, salary):
-                messagebox.showinfo("موفقیت", "کارمند اضافه شد.")
-            else:
-                messagebox.showerror("خطا", "کد تکراری است.")
-            self.show_all()
+            manager = self.manager
+
+            def work():
+                return manager.get(code) if manager.add(code, name, salary) else None
+
+            def done(emp):
+                if emp is not None:
+                    messagebox.showinfo("موفقیت", "کارمند اضافه شد.")
+                    self._tree_put(emp)
+                else:
+                    messagebox.showerror("خطا", "کد تکراری است.")
+
+            self._run(work, on_done=done)
         else:
             messagebox.showerror("خطا", "همه فیلدها را پر کنید.")
 
     def show_all(self):
         if not self.manager: return
-        rows = self.manager.get_all()
-        self.refresh_tree(rows)
+        self._run(self.manager.get_all, on_done=lambda rows: self.refresh_tree(rows, showing_all=True))
 
     def search(self):
         if not self.manager: return
@@ -211,8 +1532,7 @@ class EmployeeApp:
         if not key:
             messagebox.showerror("خطا", "کد یا نام برای جستجو وارد کنید.")
             return
-        rows = self.manager.search(key)
-        self.refresh_tree(rows)
+        self._run(self.manager.search, key, on_done=self.refresh_tree)
 
     def update(self):
         if not self.manager: return
@@ -222,11 +1542,19 @@ class EmployeeApp:
         if not code:
             messagebox.showerror("خطا", "کد کارمند را وارد کنید.")
             return
-        if self.manager.update(code, name, salary):
-            messagebox.showinfo("موفقیت", "به‌روز شد.")
-        else:
-            messagebox.showerror("خطا", "کارمند پیدا نشد.")
-        self.show_all()
+        manager = self.manager
+
+        def work():
+            return manager.get(code) if manager.update(code, name, salary) else None
+
+        def done(emp):
+            if emp is not None:
+                messagebox.showinfo("موفقیت", "به‌روز شد.")
+                self._tree_put(emp)
+            else:
+                messagebox.showerror("خطا", "کارمند پیدا نشد.")
+
+        self._run(work, on_done=done)
 
     def delete(self):
         if not self.manager: return
@@ -234,13 +1562,258 @@ class EmployeeApp:
         if not code:
             messagebox.showerror("خطا", "کد کارمند را وارد کنید.")
             return
-        if self.manager.delete(code):
-            messagebox.showinfo("موفقیت", "کارمند حذف شد.")
+
+        def done(removed):
+            if removed:
+                messagebox.showinfo("موفقیت", "کارمند حذف شد.")
+                self._tree_remove(code)
+            else:
+                messagebox.showerror("خطا", "کارمند پیدا نشد.")
+
+        self._run(self.manager.delete, code, on_done=done)
+
+    def show_stats(self):
+        if not self.manager: return
+        manager = self.manager
+
+        def done(summary):
+            lines = [f"تعداد: {summary['count']}",
+                     f"مجموع: {summary['total']:,.0f}",
+                     f"میانگین: {summary['mean']:,.0f}",
+                     f"میانه: {summary['median']:,.0f}",
+                     f"صدک ۹۰: {summary['p90']:,.0f}", "", "بر اساس ماه:"]
+            for month, group in list(summary['by_month'].items())[-12:]:
+                lines.append(f"{month}: {group['count']} نفر، مجموع {group['total']:,.0f}")
+            messagebox.showinfo("آمار حقوق", "\n".join(lines))
+
+        self._run(lambda: manager.payroll_stats().summary(), on_done=done)
+
+    def _format_of(self, path):
+        ext = os.path.splitext(path)[1].lstrip('.').lower()
+        return ext if ext in ('json', 'jsonl', 'bin', 'txt') else 'csv'
+
+    def import_file(self):
+        if not self.manager: return
+        path = filedialog.askopenfilename(filetypes=[("Employee files", "*.csv *.txt *.json *.jsonl *.bin")])
+        if not path:
+            return
+        fmt = self._format_of(path)
+        manager = self.manager
+
+        def work():
+            if fmt == 'bin':
+                with open(path, 'rb') as f:
+                    return manager.add_many(read_records(f, fmt))
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                return manager.add_many(read_records(f, fmt))
+
+        def done(stats):
+            messagebox.showinfo("موفقیت", f"{stats['rows']} کارمند اضافه شد ({stats['rows_per_sec']:.0f} ردیف در ثانیه).")
+            self.show_all()
+
+        self._run(work, on_done=done)
+
+    def export_file(self):
+        if not self.manager: return
+        path = filedialog.asksaveasfilename(defaultextension='.csv',
+                                            filetypes=[("CSV files", "*.csv"), ("JSON files", "*.json"),
+                                                       ("JSON Lines files", "*.jsonl"), ("Binary files", "*.bin")])
+        if not path:
+            return
+        fmt = self._format_of(path)
+        manager = self.manager
+
+        def work():
+            if fmt == 'bin':
+                with open(path, 'wb') as f:
+                    return manager.export(f, fmt)
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                return manager.export(f, fmt)
+
+        def done(stats):
+            messagebox.showinfo("موفقیت", f"{stats['rows']} ردیف ذخیره شد ({stats['rows_per_sec']:.0f} ردیف در ثانیه).")
+
+        self._run(work, on_done=done)
+
+STORAGE_TYPES = ['csv', 'txt', 'json', 'jsonl', 'bin', 'sqlite']
+DATA_FORMATS = ['csv', 'txt', 'json', 'jsonl', 'bin']
+
+def _storage_of(path):
+    ext = os.path.splitext(path)[1].lstrip('.').lower()
+    if ext in ('db', 'sqlite', 'sqlite3'):
+        return 'sqlite'
+    return ext if ext in STORAGE_TYPES else 'csv'
+
+def _data_format_of(path):
+    ext = os.path.splitext(path)[1].lstrip('.').lower()
+    return ext if ext in DATA_FORMATS else 'csv'
+
+def _open_stream(path, fmt, mode):
+    # '-' is stdin/stdout, left open when done
+    if path == '-':
+        stream = sys.stdin if mode == 'r' else sys.stdout
+        return nullcontext(stream.buffer if fmt == 'bin' else stream)
+    if fmt == 'bin':
+        return open(path, mode + 'b')
+    return open(path, mode, newline='', encoding='utf-8')
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='EXpertEMP', description='Employee records from the command line. '
+                                     'Without a command the GUI starts.')
+    parser.add_argument('-f', '--file', default=os.environ.get('EXPERTEMP_FILE'),
+                        help='employee file (default: $EXPERTEMP_FILE)')
+    parser.add_argument('-s', '--storage', choices=STORAGE_TYPES,
+                        help='storage type (default: from the file extension)')
+    parser.add_argument('--resident', action='store_true',
+                        help='keep the roster in memory and write it once at the end')
+    parser.add_argument('--journal', action='store_true', help='log changes to <file>.log')
+    parser.add_argument('--shared', action='store_true',
+                        help='other processes write the file too')
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+
+    cmd = commands.add_parser('add', help='add an employee')
+    cmd.add_argument('code')
+    cmd.add_argument('name')
+    cmd.add_argument('salary')
+
+    cmd = commands.add_parser('search', help='print employees whose code or name contains KEYWORD')
+    cmd.add_argument('keyword')
+    cmd.add_argument('--format', choices=['csv', 'txt', 'json', 'jsonl'], default='csv')
+
+    cmd = commands.add_parser('update', help='change the name and/or salary of an employee')
+    cmd.add_argument('code')
+    cmd.add_argument('--name', default='')
+    cmd.add_argument('--salary', default='')
+
+    cmd = commands.add_parser('delete', help='delete an employee')
+    cmd.add_argument('code')
+
+    cmd = commands.add_parser('import', help="add employees from a file ('-' for stdin)")
+    cmd.add_argument('path')
+    cmd.add_argument('--format', choices=DATA_FORMATS, help='default: from the extension, else csv')
+    cmd.add_argument('--upsert', action='store_true', help='update existing codes instead of skipping them')
+
+    cmd = commands.add_parser('export', help="write every employee to a file (default '-', stdout)")
+    cmd.add_argument('path', nargs='?', default='-')
+    cmd.add_argument('--format', choices=DATA_FORMATS, help='default: from the extension, else csv')
+
+    cmd = commands.add_parser('stats', help='salary total, mean, median and percentiles')
+    cmd.add_argument('--prefix-len', type=int, default=1, help='code prefix length to group by')
+    cmd.add_argument('--json', action='store_true', help='print the full summary as JSON')
+
+    cmd = commands.add_parser('batch', help="run one command per line from a script ('-' for stdin)")
+    cmd.add_argument('script', nargs='?', default='-')
+    cmd.add_argument('--keep-going', action='store_true', help="don't stop at the first failed line")
+    return parser
+
+def _report(message):
+    print(message, file=sys.stderr)
+
+def run_command(manager, args):
+    """Run one parsed command against manager; returns the exit status."""
+    if args.command == 'add':
+        if not manager.add(args.code, args.name, args.salary):
+            _report("خطا: کد تکراری است.")
+            return 1
+        _report("کارمند اضافه شد.")
+    elif args.command == 'search':
+        _write_rows(sys.stdout, (_as_dict(emp) for emp in manager.search(args.keyword)), args.format)
+    elif args.command == 'update':
+        if not manager.update(args.code, args.name, args.salary):
+            _report("خطا: کارمند پیدا نشد.")
+            return 1
+        _report("به‌روز شد.")
+    elif args.command == 'delete':
+        if not manager.delete(args.code):
+            _report("خطا: کارمند پیدا نشد.")
+            return 1
+        _report("کارمند حذف شد.")
+    elif args.command == 'import':
+        fmt = args.format or _data_format_of(args.path)
+        with _open_stream(args.path, fmt, 'r') as f:
+            records = read_records(f, fmt)
+            stats = manager.upsert_many(records) if args.upsert else manager.add_many(records)
+        _report(f"{stats['rows']} کارمند ثبت شد ({stats['rows_per_sec']:.0f} ردیف در ثانیه).")
+    elif args.command == 'export':
+        fmt = args.format or _data_format_of(args.path)
+        with _open_stream(args.path, fmt, 'w') as f:
+            stats = manager.export(f, fmt)
+        _report(f"{stats['rows']} ردیف ذخیره شد ({stats['rows_per_sec']:.0f} ردیف در ثانیه).")
+    elif args.command == 'stats':
+        summary = manager.payroll_stats(args.prefix_len).summary()
+        if args.json:
+            json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+            print()
         else:
-            messagebox.showerror("خطا", "کارمند پیدا نشد.")
-        self.show_all()
+            print(f"تعداد: {summary['count']}")
+            print(f"مجموع: {summary['total']:,.0f}")
+            print(f"میانگین: {summary['mean']:,.0f}")
+            print(f"میانه: {summary['median']:,.0f}")
+            print(f"صدک ۹۰: {summary['p90']:,.0f}")
+    return 0
+
+def run_batch(parser, manager, args):
+    """Run a script of commands, one per line, against a single open manager.
+
+    Blank lines and # comments are skipped. Returns the first non-zero
+    status, or 0.
+    """
+    status = 0
+    source = sys.stdin if args.script == '-' else open(args.script, encoding='utf-8')
+    with nullcontext(source) if args.script == '-' else source:
+        for number, line in enumerate(source, 1):
+            words = shlex.split(line, comments=True)
+            if not words:
+                continue
+            try:
+                line_args = parser.parse_args(words)
+            except SystemExit:  # argparse already printed why
+                result = 2
+            else:
+                if line_args.command in (None, 'batch'):
+                    _report("خطا: این دستور در اسکریپت مجاز نیست.")
+                    result = 2
+                else:
+                    try:
+                        result = run_command(manager, line_args)
+                    except Exception as error:
+                        _report(f"خطا: {error}")
+                        result = 1
+            if result:
+                _report(f"  (خط {number}: {line.strip()})")
+                status = status or result
+                if not args.keep_going:
+                    break
+    return status
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        _load_gui()
+        root = tk.Tk()
+        EmployeeApp(root)
+        root.mainloop()
+        return 0
+    if not args.file:
+        parser.error('no employee file: pass --file or set EXPERTEMP_FILE')
+    manager = EmployeeManager(args.file, storage_type=args.storage or _storage_of(args.file),
+                              resident=args.resident, journal=args.journal, shared=args.shared)
+    try:
+        if args.command == 'batch':
+            return run_batch(parser, manager, args)
+        return run_command(manager, args)
+    except BrokenPipeError:
+        # the reader went away (e.g. piped into head); keep Python from
+        # complaining about it again at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except Exception as error:
+        _report(f"خطا: {error}")
+        return 1
+    finally:
+        manager.close()
 
 if __name__ == '__main__':
-    root = tk.Tk()
-    app = EmployeeApp(root)
-    root.mainloop()
+    sys.exit(main())
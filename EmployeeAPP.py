@@ -1,11 +1,164 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from array import array
+from contextlib import contextmanager
+
+# sidecar index for mapped mode: a header, then the crc32 of every code in
+# sorted order followed by the matching line offsets. Lookups check the
+# line itself, so crc collisions only cost an extra comparison. The header
+# records how far into the file the index goes and a hash of every byte
+# before that point, so a file that was only appended to can be told apart
+# from one that was rewritten anywhere.
+_IDX_MAGIC = b'EIX1'
+_IDX_HEADER = struct.Struct('=4s4xQQqQ8s')  # magic, indexed bytes, file size, mtime, count, fingerprint
+_IDX_KEY = struct.Struct('=I')
+_IDX_OFFSET = struct.Struct('=Q')
+_OFFSET_BITS = 48
+
+_NO_FINGERPRINT = bytes(8)  # prefix changed in place by us, not hashed again
+
+def _fingerprint(mm, end):
+    digest = hashlib.blake2b(digest_size=8)
+    for pos in range(0, end, 1 << 24):
+        digest.update(mm[pos:min(pos + (1 << 24), end)])
+    return digest.digest()
+
+def _throughput(count, start):
+    seconds = time.perf_counter() - start
+    return {'rows': count, 'seconds': seconds,
+            'rows_per_sec': count / seconds if seconds else float(count)}
 
 class EmployeeManager:
-    def __init__(self, filepath):
+    # mapped mode rebuilds the index once this much was appended after it
+    TAIL_LIMIT = 8 << 20
+
+    def __init__(self, filepath, mapped=False):
         self.filepath = filepath
+        # mapped mode: lookups, searches and same-length updates work on an
+        # mmap of the file and a <file>.idx code -> offset index
+        self.mapped = mapped
+        self.index_path = filepath + '.idx'
+
+    @contextmanager
+    def _map(self, write=False):
+        try:
+            f = open(self.filepath, 'r+b' if write else 'rb')
+        except FileNotFoundError:
+            yield b'', None
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            if st.st_size == 0:  # empty files can't be mapped
+                yield b'', st
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if write else mmap.ACCESS_READ) as mm:
+                yield mm, st
+
+    def _write_header(self, indexed, count, fingerprint):
+        st = os.stat(self.filepath)
+        with open(self.index_path, 'r+b') as f:
+            f.write(_IDX_HEADER.pack(_IDX_MAGIC, indexed, st.st_size, st.st_mtime_ns, count, fingerprint))
+
+    def _build_index(self, mm, st):
+        # crc << 48 | offset sorts by code hash, then by position in the file
+        packed = []
+        pos, size = 0, len(mm)
+        while pos < size:
+            # whole lines from the next 16 MB; an unfinished last line stays
+            # in the unindexed tail
+            end = mm.rfind(b'\n', pos, min(pos + (1 << 24), size)) + 1
+            if end <= pos:
+                end = mm.find(b'\n', pos) + 1
+                if end == 0:
+                    break
+            for line in mm[pos:end].split(b'\n')[:-1]:
+                code, comma, _ = line.partition(b',')
+                if comma:
+                    packed.append(zlib.crc32(code) << _OFFSET_BITS | pos)
+                pos += len(line) + 1
+        packed.sort()
+        mask = (1 << _OFFSET_BITS) - 1
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_IDX_HEADER.pack(_IDX_MAGIC, pos, st.st_size, st.st_mtime_ns,
+                                     len(packed), _fingerprint(mm, pos)))
+            array('I', [v >> _OFFSET_BITS for v in packed]).tofile(f)
+            array('Q', [v & mask for v in packed]).tofile(f)
+        os.replace(tmp_path, self.index_path)
+        return pos, len(packed)
+
+    def _index_state(self, mm, st):
+        # (indexed bytes, entry count) of a sidecar index that still matches
+        # the file, rebuilding it if it doesn't
+        try:
+            with open(self.index_path, 'rb') as f:
+                magic, indexed, size, mtime, count, fingerprint = _IDX_HEADER.unpack(f.read(_IDX_HEADER.size))
+        except (FileNotFoundError, struct.error):
+            return self._build_index(mm, st)
+        if magic != _IDX_MAGIC:
+            return self._build_index(mm, st)
+        if (size, mtime) == (st.st_size, st.st_mtime_ns):
+            return indexed, count
+        if (indexed <= st.st_size <= indexed + self.TAIL_LIMIT and fingerprint != _NO_FINGERPRINT
+                and _fingerprint(mm, indexed) == fingerprint):
+            # only appended to since, the tail is searched directly
+            self._write_header(indexed, count, fingerprint)
+            return indexed, count
+        return self._build_index(mm, st)
+
+    def _drop_index(self):
+        try:
+            os.remove(self.index_path)
+        except FileNotFoundError:
+            pass
+
+    def _offsets(self, mm, st, code):
+        """Byte offsets of the lines for this code."""
+        if st is None:
+            return []
+        prefix = code.encode('utf-8') + b','
+        indexed, count = self._index_state(mm, st)
+        offsets = []
+        if count:
+            key = zlib.crc32(prefix[:-1])
+            keys_at = _IDX_HEADER.size
+            offsets_at = keys_at + count * _IDX_KEY.size
+            with open(self.index_path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as idx:
+                lo, hi = 0, count
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if _IDX_KEY.unpack_from(idx, keys_at + mid * _IDX_KEY.size)[0] < key:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                while lo < count and _IDX_KEY.unpack_from(idx, keys_at + lo * _IDX_KEY.size)[0] == key:
+                    offset = _IDX_OFFSET.unpack_from(idx, offsets_at + lo * _IDX_OFFSET.size)[0]
+                    # crcs can collide, check the line itself
+                    if mm[offset:offset + len(prefix)] == prefix:
+                        offsets.append(offset)
+                    lo += 1
+        # lines appended after the index was built
+        if indexed == 0 and mm[:len(prefix)] == prefix:
+            offsets.append(0)
+        needle = b'\n' + prefix
+        pos = mm.find(needle, max(indexed - 1, 0))
+        while pos >= 0:
+            offsets.append(pos + 1)
+            pos = mm.find(needle, pos + 1)
+        return offsets
 
     def exists(self, code):
+        if self.mapped:
+            with self._map() as (mm, st):
+                return bool(self._offsets(mm, st, code))
         for line in self.get_all_employees():
             if line.strip().split(',')[0] == code:
                 return True
@@ -15,9 +168,23 @@ class EmployeeManager:
         if self.exists(code):
             return False
         with open(self.filepath, 'a', encoding='utf-8') as f:
+            before = os.fstat(f.fileno())
             f.write(f"{code},{name},{salary}\n")
+        if self.mapped:
+            self._appended(before)
         return True
 
+    def _appended(self, before):
+        # our own append leaves the indexed prefix alone: move the index
+        # header along so the next lookup doesn't hash the file to see that
+        try:
+            with open(self.index_path, 'rb') as f:
+                magic, indexed, size, mtime, count, fingerprint = _IDX_HEADER.unpack(f.read(_IDX_HEADER.size))
+        except (FileNotFoundError, struct.error):
+            return
+        if magic == _IDX_MAGIC and (size, mtime) == (before.st_size, before.st_mtime_ns):
+            self._write_header(indexed, count, fingerprint)
+
     def get_all_employees(self):
         try:
             with open(self.filepath, 'r', encoding='utf-8') as f:
@@ -25,14 +192,86 @@ class EmployeeManager:
         except FileNotFoundError:
             return []
 
+    def iter_employees(self):
+        # (code, name, salary) tuples streamed from the file
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.strip().split(',')
+                    if len(parts) == 3:
+                        yield tuple(parts)
+        except FileNotFoundError:
+            return
+
+    def add_many(self, records):
+        """Append (code, name, salary) rows in one pass, skipping existing codes."""
+        start = time.perf_counter()
+        seen = {code for code, _, _ in self.iter_employees()}
+        added = 0
+        with open(self.filepath, 'a', encoding='utf-8') as f:
+            for code, name, salary in records:
+                if code in seen:
+                    continue
+                seen.add(code)
+                f.write(f"{code},{name},{salary}\n")
+                added += 1
+        return _throughput(added, start)
+
+    def upsert_many(self, records):
+        """Update or add (code, name, salary) rows with a single rewrite."""
+        start = time.perf_counter()
+        pending = {code: (name, salary) for code, name, salary in records}
+        count = len(pending)
+        tmp_path = self.filepath + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as out:
+            for code, name, salary in self.iter_employees():
+                name, salary = pending.pop(code, (name, salary))
+                out.write(f"{code},{name},{salary}\n")
+            for code, (name, salary) in pending.items():
+                out.write(f"{code},{name},{salary}\n")
+        os.replace(tmp_path, self.filepath)
+        self._drop_index()
+        return _throughput(count, start)
+
+    def export(self, stream, fmt='csv'):
+        """Stream every employee to an open text stream as csv lines or json."""
+        start = time.perf_counter()
+        count = 0
+        if fmt == 'json':
+            stream.write('[')
+            for code, name, salary in self.iter_employees():
+                stream.write(',\n  ' if count else '\n  ')
+                stream.write(json.dumps({'code': code, 'name': name, 'salary': salary}, ensure_ascii=False))
+                count += 1
+            stream.write('\n]' if count else ']')
+        else:
+            for code, name, salary in self.iter_employees():
+                stream.write(f"{code},{name},{salary}\n")
+                count += 1
+        return _throughput(count, start)
+
     def search_employee(self, keyword):
         results = []
+        if self.mapped:
+            # scan the mapped bytes and only cut out the lines that match
+            needle = keyword.encode('utf-8')
+            with self._map() as (mm, st):
+                pos = mm.find(needle)
+                while pos >= 0:
+                    start = mm.rfind(b'\n', 0, pos) + 1
+                    end = mm.find(b'\n', pos)
+                    end = len(mm) if end < 0 else end + 1
+                    results.append(mm[start:end].decode('utf-8'))
+                    pos = mm.find(needle, end)
+            return results
         for line in self.get_all_employees():
             if keyword in line:
                 results.append(line)
         return results
 
     def update_employee(self, code, new_name, new_salary):
+        if self.mapped:
+            return self._update_mapped(code, new_name, new_salary)
         lines = self.get_all_employees()
         updated = False
         with open(self.filepath, 'w', encoding='utf-8') as f:
@@ -43,8 +282,45 @@ class EmployeeManager:
                     updated = True
                 else:
                     f.write(line)
+        self._drop_index()
         return updated
 
+    def _update_mapped(self, code, new_name, new_salary):
+        new = f"{code},{new_name},{new_salary}".encode('utf-8')
+        with self._map(write=True) as (mm, st):
+            spans = []
+            for offset in self._offsets(mm, st, code):
+                end = mm.find(b'\n', offset)
+                if end < 0:
+                    end = len(mm)
+                if mm[end - 1:end] == b'\r':
+                    end -= 1
+                spans.append((offset, end))
+            if not spans:
+                return False
+            if all(end - offset == len(new) for offset, end in spans):
+                # same length: patch the bytes in place, offsets stay valid
+                for offset, end in spans:
+                    mm[offset:end] = new
+                mm.flush()
+                # hashing the whole prefix on every update would cost more
+                # than the patch; a later outside change rebuilds instead
+                indexed, count = self._index_state(mm, st)
+                self._write_header(indexed, count, _NO_FINGERPRINT)
+                return True
+        # the line changes length, stream the file through a temp copy
+        tmp_path = self.filepath + '.tmp'
+        with open(self.filepath, 'r', encoding='utf-8') as src, \
+                open(tmp_path, 'w', encoding='utf-8') as out:
+            for line in src:
+                if line.split(',', 1)[0] == code:
+                    out.write(f"{code},{new_name},{new_salary}\n")
+                else:
+                    out.write(line)
+        os.replace(tmp_path, self.filepath)
+        self._drop_index()
+        return True
+
 class EmployeeApp:
     def __init__(self, root):
         self.root = root
@@ -63,6 +339,9 @@ class EmployeeApp:
         tk.Button(root, text="نمایش همه", command=self.show_all).grid(row=4, column=0)
         tk.Button(root, text="جستجو", command=self.search).grid(row=4, column=1)
         tk.Button(root, text="به‌روزرسانی", command=self.update).grid(row=5, column=0)
+        self.mapped_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(root, text="نگاشت حافظه (فایل‌های بزرگ)",
+                       variable=self.mapped_var).grid(row=5, column=1)
 
     def _make_entry(self, label, row):
         tk.Label(self.root, text=label).grid(row=row, column=0)
@@ -73,7 +352,7 @@ class EmployeeApp:
     def select_file(self):
         path = filedialog.asksaveasfilename(defaultextension=".txt")
         if path:
-            self.manager = EmployeeManager(path)
+            self.manager = EmployeeManager(path, mapped=self.mapped_var.get())
             messagebox.showinfo("فایل انتخاب شد", f"مسیر فایل:\n{path}")
 
     def add(self):
@@ -1,9 +1,19 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import csv
+import json
+import os
+import threading
+import time
 
-class EmployeeManager:
-    def __init__(self, filepath):
+# the lock file and its optimistic commits, the search index, the table
+# paging and the worker thread are the ones EXpertEMP uses on the same kind
+# of roster
+from EXpertEMP import (BackgroundWork, FileLock, SharedFile, TreePaging,
+                       TrigramIndex, _throughput)
+
+class EmployeeManager(SharedFile):
+    def __init__(self, filepath, journal=False, compact_threshold=1000, shared=False, retries=50):
         self.filepath = filepath
         # ensure file exists
         try:
@@ -13,12 +23,158 @@ class EmployeeManager:
             with open(self.filepath, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
                 writer.writerow(['Code', 'Name', 'Salary'])
+        # journal mode: changes append to <file>.log instead of rewriting
+        # the CSV; compact() folds the log back in
+        self.journal = journal
+        self.journal_path = self.filepath + '.log'
+        self.compact_threshold = compact_threshold
+        self._journal_len = 0
+        # shared mode: other processes may write the file too. Reads take no
+        # lock; writes take the lock file just for the commit and start over
+        # if someone else committed after we read
+        self.shared = shared
+        self.retries = retries
+        self._file_lock = FileLock(self.filepath + '.lock') if shared else None
+        self._lock = threading.RLock()
+        self._seen = None
+        # search index, rebuilt whenever the file changes behind our back
+        self._rows = None
+        self._index = None
+        self._stat = None
+        # a log left by an earlier journal session is folded in whatever
+        # this session's mode, so it is never replayed over newer rows
+        if os.path.exists(self.journal_path):
+            self._fold_journal()
 
-    def get_all(self):
+    def _file_stat(self):
+        st = os.stat(self.filepath)
+        stat = (st.st_mtime_ns, st.st_size)
+        if self.journal:
+            try:
+                st = os.stat(self.journal_path)
+                stat += (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                pass
+        if self.shared:
+            # mtime and size can miss a same-length rewrite within one tick
+            stat += (self._file_lock.version(),)
+        return stat
+
+    # the stat already carries the lock file's version counter
+    _version = _file_stat
+
+    def close(self):
+        if self.journal:
+            self._fold_journal()
+        if self._file_lock is not None:
+            self._file_lock.close()
+
+    def _indexed_rows(self):
+        stat = self._file_stat()
+        if stat != self._stat:
+            self._rows = {emp['Code']: emp for emp in self.get_all()}
+            self._index = TrigramIndex(self._rows.values())
+            self._stat = stat
+        return self._rows
+
+    def _index_change(self, before, code, new=None):
+        # apply our own write to the index; if the file was touched by
+        # someone else since the index was built, rebuild it lazily instead
+        if self._stat is None:
+            return
+        if before != self._stat:
+            self._stat = None
+            return
+        old = self._rows.pop(code, None)
+        if old is not None:
+            self._index.remove(old)
+        if new is not None:
+            self._rows[code] = new
+            self._index.add(new)
+        self._stat = self._seen if self.shared else self._file_stat()
+
+    def _read_journal(self):
+        entries = []
+        try:
+            with open(self.journal_path, 'r', newline='', encoding='utf-8') as f:
+                for row in csv.reader(f):
+                    if len(row) != 4:
+                        break  # torn last line from a crash
+                    entries.append(row)
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _append_journal(self, op, code, name='', salary=''):
+        self._append_journal_many([[op, code, name, salary]])
+
+    def _append_journal_many(self, entries):
+        with self._committing():
+            with open(self.journal_path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                for entry in entries:
+                    writer.writerow(entry)
+                    self._journal_len += 1
+            if self._journal_len >= self.compact_threshold:
+                self.compact()
+
+    def _write_all(self, employees):
+        # write to a temp file and rename it so a crash can't leave half a roster
+        tmp_path = self.filepath + '.tmp'
+        with self._committing():
+            with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['Code', 'Name', 'Salary'])
+                for emp in employees:
+                    writer.writerow([emp['Code'], emp['Name'], emp['Salary']])
+            os.replace(tmp_path, self.filepath)
+
+    def compact(self):
+        if self.journal:
+            self._fold_journal()
+
+    def _fold_journal(self):
+        # the roster is read under the lock, so there is nothing to check
+        with self._committing(check=False):
+            self._write_all(self._merge_journal(self._read_rows()))
+            try:
+                os.remove(self.journal_path)
+            except FileNotFoundError:
+                pass
+            self._journal_len = 0
+
+    def _read_rows(self):
+        self._mark_read()
         with open(self.filepath, 'r', newline='', encoding='utf-8') as f:
             reader = csv.DictReader(f)
             return list(reader)
 
+    def get_all(self):
+        employees = self._read_rows()
+        return self._merge_journal(employees) if self.journal else employees
+
+    def _merge_journal(self, employees):
+        entries = self._read_journal()
+        self._journal_len = len(entries)
+        if not entries:
+            return employees
+        merged = {emp['Code']: emp for emp in employees}
+        for op, code, name, salary in entries:
+            if op == 'put':
+                merged[code] = {'Code': code, 'Name': name, 'Salary': salary}
+            else:
+                merged.pop(code, None)
+        return list(merged.values())
+
+    def iter_all(self):
+        # stream rows straight from the file unless a journal has to be merged
+        if self.journal and os.path.exists(self.journal_path):
+            yield from self.get_all()
+            return
+        self._mark_read()
+        with open(self.filepath, 'r', newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+
     def exists(self, code):
         for emp in self.get_all():
             if emp['Code'] == code:
@@ -26,49 +182,157 @@ class EmployeeManager:
         return False
 
     def add(self, code, name, salary):
+        return self._retrying(self._add, code, name, salary)
+
+    def _add(self, code, name, salary):
+        before = self._file_stat()
         if self.exists(code):
             return False
-        with open(self.filepath, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow([code, name, salary])
+        if self.journal:
+            # the log is replayed over the CSV, so an add appended there
+            # would lose to an earlier 'del' of the same code
+            self._append_journal('put', code, name, salary)
+        else:
+            with self._committing(), open(self.filepath, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow([code, name, salary])
+        self._index_change(before, code, {'Code': code, 'Name': name, 'Salary': salary})
         return True
 
+    def add_many(self, records):
+        """Append (code, name, salary) rows in one pass, skipping existing codes."""
+        start = time.perf_counter()
+        if self.shared:
+            records = list(records)  # a retry has to see them again
+        added = self._retrying(self._add_many, records)
+        self._stat = None
+        return _throughput(added, start)
+
+    def _add_many(self, records):
+        seen = {emp['Code'] for emp in self.iter_all()}
+        added = 0
+
+        def fresh():
+            nonlocal added
+            for code, name, salary in records:
+                if code in seen:
+                    continue
+                seen.add(code)
+                added += 1
+                yield [code, name, salary]
+
+        if self.journal:
+            self._append_journal_many(['put'] + row for row in fresh())
+        else:
+            with self._committing(), open(self.filepath, 'a', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows(fresh())
+        return added
+
+    def upsert_many(self, records):
+        """Update or add (code, name, salary) rows with a single write."""
+        start = time.perf_counter()
+        pending = {code: (code, name, salary) for code, name, salary in records}
+        count = len(pending)
+        self._stat = None
+
+        def merged():
+            for emp in self.iter_all():
+                row = pending.pop(emp['Code'], None)
+                if row is None:
+                    yield emp
+                else:
+                    yield {'Code': row[0], 'Name': row[1], 'Salary': row[2]}
+            for code, name, salary in pending.values():
+                yield {'Code': code, 'Name': name, 'Salary': salary}
+
+        # neither path depends on an earlier read: the journal takes blind
+        # puts and the rewrite reads the rows under the lock
+        with self._committing(check=False):
+            if self.journal:
+                self._append_journal_many([['put', code, name, salary]
+                                           for code, name, salary in pending.values()])
+            else:
+                self._write_all(merged())
+        return _throughput(count, start)
+
+    def export(self, stream, fmt='csv'):
+        """Stream every employee to an open text stream as csv or json."""
+        start = time.perf_counter()
+        count = 0
+        if fmt == 'json':
+            stream.write('[')
+            for emp in self.iter_all():
+                stream.write(',\n  ' if count else '\n  ')
+                stream.write(json.dumps(emp, ensure_ascii=False))
+                count += 1
+            stream.write('\n]' if count else ']')
+        else:
+            writer = csv.writer(stream)
+            writer.writerow(['Code', 'Name', 'Salary'])
+            for emp in self.iter_all():
+                writer.writerow([emp['Code'], emp['Name'], emp['Salary']])
+                count += 1
+        return _throughput(count, start)
+
     def search(self, keyword):
-        return [emp for emp in self.get_all() if keyword.lower() in emp['Code'].lower() or keyword.lower() in emp['Name'].lower()]
+        keyword = keyword.lower()
+        rows = self._indexed_rows()
+        # narrow down with the trigram index, then confirm the substring
+        codes = self._index.candidates(keyword)
+        candidates = rows.values() if codes is None else [rows[c] for c in codes]
+        return [emp for emp in candidates if keyword in emp['Code'].lower() or keyword in emp['Name'].lower()]
 
     def update(self, code, name, salary):
+        return self._retrying(self._update, code, name, salary)
+
+    def _update(self, code, name, salary):
+        before = self._file_stat()
+        new = {'Code': code, 'Name': name, 'Salary': salary}
+        if self.journal:
+            if not self.exists(code):
+                return False
+            self._append_journal('put', code, name, salary)
+            self._index_change(before, code, new)
+            return True
         updated = False
         employees = self.get_all()
-        with open(self.filepath, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['Code', 'Name', 'Salary'])
-            for emp in employees:
-                if emp['Code'] == code:
-                    writer.writerow([code, name, salary])
-                    updated = True
-                else:
-                    writer.writerow([emp['Code'], emp['Name'], emp['Salary']])
+        for emp in employees:
+            if emp['Code'] == code:
+                emp['Name'] = name
+                emp['Salary'] = salary
+                updated = True
+        if updated:
+            self._write_all(employees)
+            self._index_change(before, code, new)
         return updated
 
     def delete(self, code):
-        removed = False
+        return self._retrying(self._delete, code)
+
+    def _delete(self, code):
+        before = self._file_stat()
+        if self.journal:
+            if not self.exists(code):
+                return False
+            self._append_journal('del', code)
+            self._index_change(before, code)
+            return True
         employees = self.get_all()
-        with open(self.filepath, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['Code', 'Name', 'Salary'])
-            for emp in employees:
-                if emp['Code'] == code:
-                    removed = True
-                    continue
-                writer.writerow([emp['Code'], emp['Name'], emp['Salary']])
-        return removed
+        remaining = [emp for emp in employees if emp['Code'] != code]
+        if len(remaining) == len(employees):
+            return False
+        self._write_all(remaining)
+        self._index_change(before, code)
+        return True
 
-class EmployeeApp:
+class EmployeeApp(TreePaging, BackgroundWork):
     def __init__(self, root):
         self.root = root
         self.root.title("مدیریت کارکنان CSV")
         self.root.geometry("700x500")
         self.manager = None
+        self._init_worker()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.style = ttk.Style(root)
         self.style.theme_use('clam')
         self.style.configure('Treeview',
@@ -100,25 +364,43 @@ class EmployeeApp:
         tk.Button(btn_frame, text="جستجو", command=self.search, bg='#01579b', fg='white').pack(side='left', padx=5)
         tk.Button(btn_frame, text="به‌روزرسانی", command=self.update, bg='#006064', fg='white').pack(side='left', padx=5)
         tk.Button(btn_frame, text="حذف", command=self.delete, bg='#d32f2f', fg='white').pack(side='left', padx=5)
+        tk.Button(btn_frame, text="لغو", command=self.cancel).pack(side='right', padx=5)
+        self.progress = ttk.Progressbar(btn_frame, mode='indeterminate', length=100)
+        self.progress.pack(side='right', padx=5)
 
         # نمایش جدول
-        self.tree = ttk.Treeview(root, columns=('Code','Name','Salary'), show='headings')
+        tree_frame = tk.Frame(root)
+        tree_frame.pack(fill='both', expand=True, padx=10, pady=10)
+        self.tree = ttk.Treeview(tree_frame, columns=('Code','Name','Salary'), show='headings')
         self.tree.heading('Code', text='کد')
         self.tree.heading('Name', text='نام')
         self.tree.heading('Salary', text='حقوق')
-        self.tree.pack(fill='both', expand=True, padx=10, pady=10)
+        self.scrollbar = ttk.Scrollbar(tree_frame, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
+        self.scrollbar.pack(side='right', fill='y')
+        self.tree.pack(side='left', fill='both', expand=True)
+        self._init_paging()
 
     def select_file(self):
         path = filedialog.asksaveasfilename(defaultextension='.csv', filetypes=[('CSV files','*.csv')])
         if path:
-            self.manager = EmployeeManager(path)
-            messagebox.showinfo("فایل انتخاب شد", f"مسیر فایل:{path}")
+            old = self.manager
+            self.manager = None
+
+            def open_manager():
+                if old:
+                    old.close()
+                # other clerks may have the same file open
+                return EmployeeManager(path, shared=True)
 
-    def refresh_tree(self, rows):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        for emp in rows:
-            self.tree.insert('', 'end', values=(emp['Code'], emp['Name'], emp['Salary']))
+            def done(manager):
+                self.manager = manager
+                messagebox.showinfo("فایل انتخاب شد", f"مسیر فایل:{path}")
+
+            self._run(open_manager, on_done=done)
+
+    def _row_values(self, emp):
+        return (emp['Code'], emp['Name'], emp['Salary'])
 
     def add(self):
         if not self.manager: return
@@ -126,18 +408,20 @@ class EmployeeApp:
         name = self.name_entry.get().strip()
         salary = self.salary_entry.get().strip()
         if code and name and salary:
-            if self.manager.add(code, name, salary):
-                messagebox.showinfo("موفقیت", "کارمند اضافه شد.")
-            else:
-                messagebox.showerror("خطا", "کد تکراری است.")
-            self.show_all()
+            def done(added):
+                if added:
+                    messagebox.showinfo("موفقیت", "کارمند اضافه شد.")
+                    self._tree_put({'Code': code, 'Name': name, 'Salary': salary})
+                else:
+                    messagebox.showerror("خطا", "کد تکراری است.")
+
+            self._run(self.manager.add, code, name, salary, on_done=done)
         else:
             messagebox.showerror("خطا", "همه فیلدها را پر کنید.")
 
     def show_all(self):
         if not self.manager: return
-        rows = self.manager.get_all()
-        self.refresh_tree(rows)
+        self._run(self.manager.get_all, on_done=lambda rows: self.refresh_tree(rows, showing_all=True))
 
     def search(self):
         if not self.manager: return
@@ -145,8 +429,7 @@ class EmployeeApp:
         if not key:
             messagebox.showerror("خطا", "کد یا نام برای جستجو وارد کنید.")
             return
-        rows = self.manager.search(key)
-        self.refresh_tree(rows)
+        self._run(self.manager.search, key, on_done=self.refresh_tree)
 
     def update(self):
         if not self.manager: return
@@ -156,11 +439,15 @@ class EmployeeApp:
         if not code:
             messagebox.showerror("خطا", "کد کارمند را وارد کنید.")
             return
-        if self.manager.update(code, name, salary):
-            messagebox.showinfo("موفقیت", "به‌روز شد.")
-        else:
-            messagebox.showerror("خطا", "کارمند پیدا نشد.")
-        self.show_all()
+
+        def done(updated):
+            if updated:
+                messagebox.showinfo("موفقیت", "به‌روز شد.")
+                self._tree_put({'Code': code, 'Name': name, 'Salary': salary})
+            else:
+                messagebox.showerror("خطا", "کارمند پیدا نشد.")
+
+        self._run(self.manager.update, code, name, salary, on_done=done)
 
     def delete(self):
         if not self.manager: return
@@ -168,11 +455,15 @@ class EmployeeApp:
         if not code:
             messagebox.showerror("خطا", "کد کارمند را وارد کنید.")
             return
-        if self.manager.delete(code):
-            messagebox.showinfo("موفقیت", "کارمند حذف شد.")
-        else:
-            messagebox.showerror("خطا", "کارمند پیدا نشد.")
-        self.show_all()
+
+        def done(removed):
+            if removed:
+                messagebox.showinfo("موفقیت", "کارمند حذف شد.")
+                self._tree_remove(code)
+            else:
+                messagebox.showerror("خطا", "کارمند پیدا نشد.")
+
+        self._run(self.manager.delete, code, on_done=done)
 
 if __name__ == '__main__':
     root = tk.Tk()
@@ -1,8 +1,16 @@
+import hashlib
+import json
 import os
+import time
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 
+# the table paging is the one EXpertEMP's window uses
+from EXpertEMP import TreePaging
+
 class Employee:
+    __slots__ = ('code', 'last_name', 'salary')
+
     def __init__(self, code, last_name, salary):
         self.code = code
         self.last_name = last_name
@@ -11,53 +19,218 @@ class Employee:
     def to_string(self):
         return f"{self.code},{self.last_name},{self.salary}"
 
+def _throughput(count, start):
+    seconds = time.perf_counter() - start
+    return {'rows': count, 'seconds': seconds,
+            'rows_per_sec': count / seconds if seconds else float(count)}
+
 class EmployeeFileManager:
     def __init__(self, file_path):
         self.file_path = file_path
         self.employees = []
+        # code -> position in self.employees; a later line for the same code
+        # replaces the earlier one
+        self._by_code = {}
+        # what has been read so far: (inode, mtime, size) at that point, the
+        # byte offset after the last complete line and a hash of everything
+        # before it, used to tell an appended file from a rewritten one
+        self._stat = None
+        self._offset = 0
+        self._digest = hashlib.sha1()
+        # in-memory changes not written yet: new employees, and edited ones by code
+        self._unsaved = []
+        self._edited = {}
+
+    def _put(self, emp):
+        i = self._by_code.get(emp.code)
+        if i is None:
+            self._by_code[emp.code] = len(self.employees)
+            self.employees.append(emp)
+            return emp
+        old = self.employees[i]
+        old.last_name = emp.last_name
+        old.salary = emp.salary
+        return old
+
+    def _parse(self, data, offset):
+        end = data.rfind(b'\n') + 1
+        lines = data[:end].decode('utf-8').splitlines()
+        # a last line without a newline may still be being written: use it,
+        # but read it again next time
+        if end < len(data):
+            lines.append(data[end:].decode('utf-8', errors='ignore'))
+        for line in lines:
+            parts = line.strip().split(',')
+            if len(parts) == 3:
+                code, last_name, salary = parts
+                self._put(Employee(code, last_name, salary))
+        self._digest.update(data[:end])
+        self._offset = offset + end
+
+    def _same_prefix(self, file):
+        # hashing the part already read is much cheaper than parsing it
+        # again, and unlike mtime or a few bytes near the end it catches an
+        # edit anywhere in it
+        digest = hashlib.sha1()
+        remaining = self._offset
+        while remaining:
+            chunk = file.read(min(remaining, 1 << 20))
+            if not chunk:
+                return False
+            digest.update(chunk)
+            remaining -= len(chunk)
+        return digest.digest() == self._digest.digest()
+
+    def _remember(self):
+        st = os.stat(self.file_path)
+        self._stat = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _tail(self):
+        # read only what was appended since the last load; False if the file
+        # is gone or was rewritten and needs a full load
+        try:
+            st = os.stat(self.file_path)
+        except FileNotFoundError:
+            return False
+        if self._stat is None or st.st_ino != self._stat[0] or st.st_size < self._offset:
+            return False
+        if (st.st_mtime_ns, st.st_size) == self._stat[1:]:
+            return True
+        with open(self.file_path, 'rb') as file:
+            if not self._same_prefix(file):
+                return False
+            data = file.read()
+        self._parse(data, self._offset)
+        self._stat = (st.st_ino, st.st_mtime_ns, st.st_size)
+        return True
 
     def load_data(self):
+        """Pick up changes to the file, reading only appended lines when possible."""
+        if not self._tail():
+            self._reload()
+
+    def _reload(self):
         self.employees.clear()
+        self._by_code.clear()
+        self._unsaved = []
+        self._edited = {}
+        self._stat = None
+        self._offset = 0
+        self._digest = hashlib.sha1()
         if not os.path.exists(self.file_path):
             return
-        with open(self.file_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                parts = line.strip().split(',')
-                if len(parts) == 3:
-                    code, last_name, salary = parts
-                    self.employees.append(Employee(code, last_name, salary))
+        with open(self.file_path, 'rb') as file:
+            data = file.read()
+        self._parse(data, 0)
+        self._remember()
 
     def save_data(self):
-        with open(self.file_path, 'w', encoding='utf-8') as file:
-            for emp in self.employees:
-                file.write(emp.to_string() + '\n')
+        """Write in-memory changes, appending when only new employees were added."""
+        if not self._edited and not self._unsaved:
+            return
+        # take in whatever was written to the file since we read it, then
+        # put our changes back on top, so the file is never rewritten from
+        # a copy that is out of date
+        pending = [(emp.code, emp.last_name, emp.salary)
+                   for emp in self._unsaved + list(self._edited.values())]
+        if self._tail():
+            # appended lines for the same codes replaced our values in place
+            for code, last_name, salary in pending:
+                emp = self.employees[self._by_code[code]]
+                emp.last_name = last_name
+                emp.salary = salary
+        else:
+            self._reload()
+            for code, last_name, salary in pending:
+                self._set(code, last_name, salary)
+            if not self._edited and not self._unsaved:
+                return
+        if not self._edited and self._stat is not None and self._offset == self._stat[2]:
+            data = ''.join(emp.to_string() + '\n' for emp in self._unsaved).encode('utf-8')
+            with open(self.file_path, 'ab') as file:
+                file.write(data)
+            self._digest.update(data)
+            self._offset += len(data)
+        else:
+            data = ''.join(emp.to_string() + '\n' for emp in self.employees).encode('utf-8')
+            with open(self.file_path, 'wb') as file:
+                file.write(data)
+            self._digest = hashlib.sha1(data)
+            self._offset = len(data)
+        self._remember()
+        self._unsaved = []
+        self._edited = {}
 
     def display(self):
         return [emp.to_string() for emp in self.employees]
 
+    def _set(self, code, last_name, salary):
+        i = self._by_code.get(code)
+        if i is None:
+            emp = self._put(Employee(code, last_name, salary))
+            self._unsaved.append(emp)
+            return
+        emp = self.employees[i]
+        if emp.last_name == last_name and emp.salary == salary:
+            return
+        emp.last_name = last_name
+        emp.salary = salary
+        if emp not in self._unsaved:
+            self._edited[code] = emp
+
     def update(self, code, last_name, salary):
-        found = False
-        for emp in self.employees:
-            if emp.code == code:
-                emp.last_name = last_name
-                emp.salary = salary
-                found = True
-                break
-        if not found:
-            # اگر کارمند پیدا نشد، افزودن جدید
-            self.employees.append(Employee(code, last_name, salary))
+        # اگر کارمند پیدا نشد، افزودن جدید
+        self._set(code, last_name, salary)
+        self.save_data()
+
+    def add_many(self, records):
+        """Add (code, last_name, salary) rows, skipping codes already loaded."""
+        start = time.perf_counter()
+        added = 0
+        for code, last_name, salary in records:
+            if code in self._by_code:
+                continue
+            self._unsaved.append(self._put(Employee(code, last_name, salary)))
+            added += 1
         self.save_data()
+        return _throughput(added, start)
+
+    def upsert_many(self, records):
+        """Update or add many employees and save the file once.
+
+        Rows identical to what is already loaded are skipped, so a sync that
+        only brings new employees is a plain append.
+        """
+        start = time.perf_counter()
+        count = 0
+        for code, last_name, salary in records:
+            self._set(code, last_name, salary)
+            count += 1
+        self.save_data()
+        return _throughput(count, start)
+
+    def export(self, stream, fmt='csv'):
+        """Write all employees to an open text stream as csv lines or json."""
+        start = time.perf_counter()
+        if fmt == 'json':
+            stream.write('[')
+            for i, emp in enumerate(self.employees):
+                stream.write(',\n  ' if i else '\n  ')
+                stream.write(json.dumps({'code': emp.code, 'last_name': emp.last_name,
+                                         'salary': emp.salary}, ensure_ascii=False))
+            stream.write('\n]' if self.employees else ']')
+        else:
+            for emp in self.employees:
+                stream.write(emp.to_string() + '\n')
+        return _throughput(len(self.employees), start)
 
     def search(self, search_term, search_by='code'):
-        results = []
-        for emp in self.employees:
-            if search_by == 'code' and emp.code == search_term:
-                results.append(emp)
-            elif search_by == 'last_name' and emp.last_name == search_term:
-                results.append(emp)
-        return results
-
-class App:
+        if search_by == 'code':
+            i = self._by_code.get(search_term)
+            return [] if i is None else [self.employees[i]]
+        return [emp for emp in self.employees if search_by == 'last_name' and emp.last_name == search_term]
+
+class App(TreePaging):
     def __init__(self, root):
         self.root = root
         self.root.title("مدیریت کارکنان")
@@ -114,11 +287,17 @@ class App:
         self.btn_search.pack(side=tk.LEFT, padx=5)
 
         # قسمت نمایش نتایج
-        self.tree = ttk.Treeview(root, columns=('کد', 'نام خانوادگی', 'حقوق'), show='headings')
+        self.frame_tree = tk.Frame(root)
+        self.frame_tree.pack(pady=10, fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(self.frame_tree, columns=('کد', 'نام خانوادگی', 'حقوق'), show='headings')
         self.tree.heading('کد', text='کد کارمند')
         self.tree.heading('نام خانوادگی', text='نام خانوادگی')
         self.tree.heading('حقوق', text='حقوق دریافتی')
-        self.tree.pack(pady=10, fill=tk.BOTH, expand=True)
+        self.scrollbar = ttk.Scrollbar(self.frame_tree, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self._init_paging()
 
     def browse_file(self):
         path = filedialog.askopenfilename()
@@ -128,18 +307,20 @@ class App:
             self.file_manager.load_data()
             self.display_employees()
 
+    def _row_values(self, emp):
+        return (emp.code, emp.last_name, emp.salary)
+
+    def _row_code(self, emp):
+        return emp.code
+
     def display_employees(self):
         if self.file_manager:
-            # پاک کردن آیتم‌های قبلی
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            # افزودن داده‌ها
-            for emp_str in self.file_manager.display():
-                code, last_name, salary = emp_str.split(',')
-                self.tree.insert('', 'end', values=(code, last_name, salary))
+            self.refresh_tree(self.file_manager.employees, showing_all=True)
         else:
             messagebox.showwarning("خطا", "لطفاً ابتدا مسیر فایل را انتخاب کنید.")
 
+    show_all = display_employees  # what TreePaging falls back to
+
     def update_employee(self):
         if self.file_manager:
             code = self.entry_code.get().strip()
@@ -151,7 +332,7 @@ class App:
                 return
 
             self.file_manager.update(code, last_name, salary)
-            self.display_employees()
+            self._tree_put(self.file_manager.search(code)[0])
         else:
             messagebox.showwarning("خطا", "لطفاً ابتدا مسیر فایل را انتخاب کنید.")
 
@@ -162,15 +343,8 @@ class App:
                 messagebox.showwarning("خطا", "لطفاً متن جستجو را وارد کنید.")
                 return
             results = self.file_manager.search(search_term, self.search_by_var.get())
-
-            # پاک کردن آیتم‌های قبلی
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-
-            if results:
-                for emp in results:
-                    self.tree.insert('', 'end', values=(emp.code, emp.last_name, emp.salary))
-            else:
+            self.refresh_tree(results)
+            if not results:
                 messagebox.showinfo("نتیجه", "موردی یافت نشد.")
         else:
             messagebox.showwarning("خطا", "لطفاً ابتدا مسیر فایل را انتخاب کنید.")
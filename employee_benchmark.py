@@ -0,0 +1,304 @@
+"""Headless benchmark for the employee stores.
+
+Builds a synthetic roster of each size for each store, then times
+add/exists/search/update/delete through the store's own manager class
+(no Tk window is created). Every store and size runs in a fresh process so
+the peak RSS belongs to that run alone.
+
+    python employee_benchmark.py --sizes 1k,10k,100k --out results.json
+    python employee_benchmark.py --targets v2,expert-csv --sizes 1M --ops 50
+    python employee_benchmark.py --sizes 10k --out new.csv --baseline results.json
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SURNAMES = ['Ahmadi', 'Hosseini', 'Karimi', 'Moradi', 'Rezaei', 'Jafari', 'Rahimi',
+            'Mohammadi', 'Kazemi', 'Sadeghi', 'Ebrahimi', 'Hashemi', 'Mousavi', 'Ghasemi']
+OPS = ['add', 'exists', 'search', 'update', 'delete']
+FIELDS = ['target', 'size', 'op', 'ops', 'ops_per_sec', 'p50_ms', 'p99_ms',
+          'bytes_per_op', 'seed_seconds', 'peak_rss_mb']
+
+def code_of(i):
+    return f'{i:08d}'
+
+def name_of(i):
+    return f'{SURNAMES[i % len(SURNAMES)]}{i}'
+
+def synthetic_rows(size, rng):
+    for i in range(size):
+        yield code_of(i), name_of(i), str(rng.randint(20, 400) * 1000)
+
+# one adapter per store, each exposing the operations it actually has
+
+class AppStore:
+    def __init__(self, path, mapped=False):
+        from EmployeeAPP import EmployeeManager
+        self.manager = EmployeeManager(path, mapped=mapped)
+
+    def seed(self, rows):
+        self.manager.add_many(rows)
+
+    def add(self, code, name, salary):
+        self.manager.add_employee(code, name, salary)
+
+    def exists(self, code):
+        self.manager.exists(code)
+
+    def search(self, keyword):
+        self.manager.search_employee(keyword)
+
+    def update(self, code, name, salary):
+        self.manager.update_employee(code, name, salary)
+
+class SimpleStore:
+    def __init__(self, path):
+        from Simple_emp import EmployeeFileManager
+        self.manager = EmployeeFileManager(path)
+        self.manager.load_data()
+
+    def seed(self, rows):
+        self.manager.add_many(rows)
+
+    def add(self, code, name, salary):
+        self.manager.update(code, name, salary)  # update() adds unknown codes
+
+    def exists(self, code):
+        self.manager.search(code, 'code')
+
+    def search(self, keyword):
+        self.manager.search(keyword, 'last_name')
+
+    def update(self, code, name, salary):
+        self.manager.update(code, name, salary)
+
+class V2Store:
+    def __init__(self, path, journal=False):
+        from EmployeeAPP_v2 import EmployeeManager
+        self.manager = EmployeeManager(path, journal=journal)
+
+    def seed(self, rows):
+        self.manager.add_many(rows)
+
+    def add(self, code, name, salary):
+        self.manager.add(code, name, salary)
+
+    def exists(self, code):
+        self.manager.exists(code)
+
+    def search(self, keyword):
+        self.manager.search(keyword)
+
+    def update(self, code, name, salary):
+        self.manager.update(code, name, salary)
+
+    def delete(self, code):
+        self.manager.delete(code)
+
+class ExpertStore(V2Store):
+    def __init__(self, path, storage_type, **options):
+        from EXpertEMP import EmployeeManager
+        self.manager = EmployeeManager(path, storage_type=storage_type, **options)
+
+    def seed(self, rows):
+        self.manager.add_many({'Code': code, 'Name': name, 'Salary': salary}
+                              for code, name, salary in rows)
+
+    def close(self):
+        self.manager.close()
+
+# name -> (file extension, store factory)
+TARGETS = {
+    'app': ('txt', AppStore),
+    'app-mapped': ('txt', lambda path: AppStore(path, mapped=True)),
+    'simple': ('txt', SimpleStore),
+    'v2': ('csv', V2Store),
+    'v2-journal': ('csv', lambda path: V2Store(path, journal=True)),
+    'expert-csv': ('csv', lambda path: ExpertStore(path, 'csv')),
+    'expert-txt': ('txt', lambda path: ExpertStore(path, 'txt')),
+    'expert-json': ('json', lambda path: ExpertStore(path, 'json')),
+    'expert-jsonl': ('jsonl', lambda path: ExpertStore(path, 'jsonl')),
+    'expert-bin': ('bin', lambda path: ExpertStore(path, 'bin')),
+    'expert-sqlite': ('sqlite', lambda path: ExpertStore(path, 'sqlite')),
+    'expert-resident': ('csv', lambda path: ExpertStore(path, 'csv', resident=True)),
+    'expert-journal': ('csv', lambda path: ExpertStore(path, 'csv', journal=True)),
+}
+DEFAULT_TARGETS = ['app', 'simple', 'v2', 'expert-csv', 'expert-txt', 'expert-json']
+
+def bytes_written():
+    # bytes handed to write() by this process so far, where the OS tells us
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+def run_one(target, size, ops, budget, seed):
+    """Benchmark one store at one roster size; returns a row per operation."""
+    rng = random.Random(seed)
+    workdir = tempfile.mkdtemp(prefix='emp-bench-')
+    try:
+        ext, factory = TARGETS[target]
+        store = factory(os.path.join(workdir, 'roster.' + ext))
+        start = time.perf_counter()
+        store.seed(synthetic_rows(size, rng))
+        seed_seconds = time.perf_counter() - start
+
+        picks = rng.sample(range(size), min(size, ops))
+        args = {
+            'add': lambda n: (f'N{n:07d}', name_of(size + n), '50000'),
+            'exists': lambda n: (code_of(picks[n % len(picks)]),),
+            'search': lambda n: (name_of(picks[n % len(picks)]),),
+            'update': lambda n: (code_of(picks[n % len(picks)]), name_of(picks[n % len(picks)]), '60000'),
+            # each code is deleted once
+            'delete': lambda n: (code_of(picks[n]),),
+        }
+        rows = []
+        for op in OPS:
+            func = getattr(store, op, None)
+            if func is None:
+                continue
+            count = ops if op != 'delete' else len(picks)
+            latencies = []
+            written = bytes_written()
+            deadline = time.perf_counter() + budget
+            for n in range(count):
+                call_args = args[op](n)
+                t0 = time.perf_counter()
+                func(*call_args)
+                t1 = time.perf_counter()
+                latencies.append(t1 - t0)
+                if t1 > deadline:
+                    break
+            after = bytes_written()
+            latencies.sort()
+            total = sum(latencies)
+            rows.append({
+                'target': target, 'size': size, 'op': op, 'ops': len(latencies),
+                'ops_per_sec': len(latencies) / total if total else float(len(latencies)),
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'bytes_per_op': None if written is None else (after - written) / len(latencies),
+                'seed_seconds': seed_seconds,
+            })
+        if hasattr(store, 'close'):
+            store.close()
+        rss = peak_rss_mb()
+        for row in rows:
+            row['peak_rss_mb'] = rss
+        return rows
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def run_isolated(target, size, ops, budget, seed):
+    # a fresh interpreter per run keeps peak RSS and imports from leaking between runs
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--one', target, str(size),
+                          '--ops', str(ops), '--budget', str(budget), '--seed', str(seed)],
+                         capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if out.returncode != 0:
+        raise RuntimeError(f'{target} @ {size} failed:\n{out.stderr}')
+    return json.loads(out.stdout)
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+def write_results(path, rows, meta):
+    if path.endswith('.csv'):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'results': rows}, f, indent=2)
+
+def read_results(path):
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            return [dict(row, size=int(row['size']), ops_per_sec=float(row['ops_per_sec']))
+                    for row in csv.DictReader(f)]
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['results']
+
+def fmt(value, spec):
+    return '-' if value is None else format(value, spec)
+
+def print_table(rows, baseline=None):
+    before = {(r['target'], r['size'], r['op']): r['ops_per_sec'] for r in baseline or ()}
+    print(f"{'target':<16}{'size':>10} {'op':<8}{'ops':>6}{'ops/sec':>12}{'p50 ms':>10}"
+          f"{'p99 ms':>10}{'B/op':>12}{'RSS MB':>9}" + ('  vs baseline' if baseline else ''))
+    for r in rows:
+        line = (f"{r['target']:<16}{r['size']:>10} {r['op']:<8}{r['ops']:>6}{r['ops_per_sec']:>12.1f}"
+                f"{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}{fmt(r['bytes_per_op'], '>12.0f')}"
+                f"{fmt(r['peak_rss_mb'], '>9.1f')}")
+        old = before.get((r['target'], r['size'], r['op']))
+        if old:
+            line += f"  {(r['ops_per_sec'] / old - 1) * 100:+.1f}%"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--targets', default=','.join(DEFAULT_TARGETS),
+                        help='comma separated, any of: ' + ', '.join(TARGETS))
+    parser.add_argument('--sizes', default='1k,10k,100k', help='roster sizes, e.g. 1k,100k,10M')
+    parser.add_argument('--ops', type=int, default=200, help='operations per kind')
+    parser.add_argument('--budget', type=float, default=10.0,
+                        help='seconds per operation kind before moving on')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help='write results to a .json or .csv file')
+    parser.add_argument('--baseline', help='earlier results file to compare ops/sec against')
+    parser.add_argument('--one', nargs=2, metavar=('TARGET', 'SIZE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        target, size = args.one
+        json.dump(run_one(target, int(size), args.ops, args.budget, args.seed), sys.stdout)
+        return
+
+    targets = [t.strip() for t in args.targets.split(',') if t.strip()]
+    unknown = [t for t in targets if t not in TARGETS]
+    if unknown:
+        parser.error('unknown target(s): ' + ', '.join(unknown))
+    rows = []
+    for size in map(parse_size, args.sizes.split(',')):
+        for target in targets:
+            print(f'{target} @ {size} ...', file=sys.stderr)
+            rows.extend(run_isolated(target, size, args.ops, args.budget, args.seed))
+
+    print_table(rows, read_results(args.baseline) if args.baseline else None)
+    if args.out:
+        meta = {'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(),
+                'platform': platform.platform(), 'ops': args.ops, 'budget': args.budget,
+                'seed': args.seed}
+        write_results(args.out, rows, meta)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Stress test for employee files shared between processes.
+
+Starts N processes that run a mix of add/update/delete/search against one
+roster through EmployeeAPP_v2 or EXpertEMP, then checks the file against what
+every process believes it wrote and reports throughput and lost updates.
+
+    python employee_stress.py --procs 8 --ops 300
+    python employee_stress.py --app expert --storage jsonl --journal
+    python employee_stress.py --unlocked    # same run without shared mode
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+OPS = ['add'] * 4 + ['update'] * 4 + ['delete'] + ['search']
+
+def open_manager(args):
+    if args.app == 'v2':
+        from EmployeeAPP_v2 import EmployeeManager
+        return EmployeeManager(args.path, journal=args.journal, shared=not args.unlocked)
+    from EXpertEMP import EmployeeManager
+    return EmployeeManager(args.path, storage_type=args.storage, journal=args.journal,
+                           resident=args.resident, shared=not args.unlocked)
+
+def worker(args, number, barrier, results):
+    rng = random.Random(number)
+    manager = open_manager(args)
+    expected = {}  # code -> salary this process last wrote, None once deleted
+    live = []
+    errors = 0
+    barrier.wait()
+    start = time.perf_counter()
+    for i in range(args.ops):
+        op = rng.choice(OPS) if live else 'add'
+        salary = str(rng.randint(1000, 99999))
+        try:
+            if op == 'add':
+                code = f'P{number}-{i}'
+                if manager.add(code, f'Worker {number} #{i}', salary):
+                    expected[code] = salary
+                    live.append(code)
+            elif op == 'update':
+                code = rng.choice(live)
+                if manager.update(code, f'Worker {number} #{i}', salary):
+                    expected[code] = salary
+            elif op == 'delete':
+                code = live.pop(rng.randrange(len(live)))
+                if manager.delete(code):
+                    expected[code] = None
+            else:
+                manager.search(f'P{number}-')
+        except Exception:
+            errors += 1
+    seconds = time.perf_counter() - start
+    if hasattr(manager, 'close'):
+        manager.close()
+    results.put((number, seconds, errors, expected))
+
+def run(args):
+    barrier = multiprocessing.Barrier(args.procs)
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker, args=(args, n, barrier, results))
+             for n in range(args.procs)]
+    open_manager(args)  # create the file before anyone races to do it
+    for p in procs:
+        p.start()
+    reports = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    final = {emp['Code']: emp['Salary'] for emp in open_manager(args).get_all()}
+    lost = 0
+    for _, _, _, expected in reports:
+        for code, salary in expected.items():
+            if final.get(code) != salary:
+                lost += 1
+    total_ops = args.procs * args.ops
+    wall = max(seconds for _, seconds, _, _ in reports)
+    return {
+        'app': args.app,
+        'storage': args.storage if args.app == 'expert' else 'csv',
+        'journal': args.journal,
+        'shared': not args.unlocked,
+        'procs': args.procs,
+        'ops': total_ops,
+        'seconds': wall,
+        'ops_per_sec': total_ops / wall if wall else float(total_ops),
+        'errors': sum(errors for _, _, errors, _ in reports),
+        'checked': sum(len(expected) for _, _, _, expected in reports),
+        'lost_updates': lost,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--app', choices=['v2', 'expert'], default='v2')
+    parser.add_argument('--storage', default='csv', help="EXpertEMP storage type")
+    parser.add_argument('--journal', action='store_true')
+    parser.add_argument('--resident', action='store_true', help="EXpertEMP resident mode")
+    parser.add_argument('--unlocked', action='store_true', help="run without shared mode")
+    parser.add_argument('--procs', type=int, default=4)
+    parser.add_argument('--ops', type=int, default=200, help="operations per process")
+    parser.add_argument('--path', help="roster file (default: a fresh temp file)")
+    parser.add_argument('--json', help="also write the result to this file")
+    args = parser.parse_args()
+    workdir = None
+    if args.path is None:
+        ext = args.storage if args.app == 'expert' else 'csv'
+        workdir = tempfile.mkdtemp(prefix='emp-stress-')
+        args.path = os.path.join(workdir, 'roster.' + ext)
+    try:
+        result = run(args)
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    for key, value in result.items():
+        print(f'{key:>13}: {value:.1f}' if isinstance(value, float) else f'{key:>13}: {value}')
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Sales throughput of ShopManager under different connection setups.
+
+Runs the same stream of sales against a fresh database per setup:
+
+    before        rollback journal, synchronous=FULL, commit per sale
+    wal           WAL + synchronous=NORMAL + cache/mmap, commit per sale
+    group         the above with group commit every --group sales
+    transaction   the above with every sale inside one transaction()
+    sell_many     the above with all sales passed to one sell_many() call
+    async         --coroutines coroutines selling through one AsyncShopManager
+
+    python shop_benchmark.py --sales 5000 --group 100 --json results.json
+    python shop_benchmark.py --setups wal,async --coroutines 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from shopapp import AsyncShopManager, ShopManager
+
+SETUPS = {
+    'before': dict(journal_mode=None, synchronous=None, cache_size_kb=None, mmap_size=None),
+    'wal': {},
+    'group': {},  # group_commit filled in from --group
+    'transaction': {},
+    'sell_many': {},
+    'async': {},  # coroutines filled in from --coroutines
+}
+
+async def sell_concurrently(db_name, items, coroutines):
+    async with AsyncShopManager(db_name) as manager:
+        async def seller(share):
+            for product_id, quantity in share:
+                await manager.sell(product_id, quantity)
+        await asyncio.gather(*(seller(items[n::coroutines]) for n in range(coroutines)))
+
+def run_setup(name, options, sales, products, seed):
+    options = dict(options)
+    coroutines = options.pop('coroutines', 1)
+    rng = random.Random(seed)
+    workdir = tempfile.mkdtemp(prefix='shop-bench-')
+    try:
+        manager = ShopManager(os.path.join(workdir, 'shop.db'), **options)
+        ids = []
+        with manager.transaction():
+            for i in range(products):
+                ids.append(manager.add_product(f'product {i}', 10.0, 15.0, sales).id)
+        items = [(rng.choice(ids), rng.randint(1, 3)) for _ in range(sales)]
+
+        if name == 'async':
+            manager.close()
+        start = time.perf_counter()
+        if name == 'async':
+            asyncio.run(sell_concurrently(os.path.join(workdir, 'shop.db'), items, coroutines))
+        elif name == 'sell_many':
+            manager.sell_many(items)
+        elif name == 'transaction':
+            with manager.transaction():
+                for product_id, quantity in items:
+                    manager.sell(product_id, quantity)
+        else:
+            for product_id, quantity in items:
+                manager.sell(product_id, quantity)
+            manager.flush()
+        seconds = time.perf_counter() - start
+        manager.close()  # a no-op if already closed
+        return {'setup': name, 'sales': sales, 'seconds': seconds,
+                'sales_per_sec': sales / seconds if seconds else float(sales)}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sales', type=int, default=2000)
+    parser.add_argument('--products', type=int, default=100)
+    parser.add_argument('--group', type=int, default=100, help='sales per commit in group mode')
+    parser.add_argument('--coroutines', type=int, default=100, help='concurrent sellers in async mode')
+    parser.add_argument('--setups', default=','.join(SETUPS))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    results = []
+    for name in args.setups.split(','):
+        options = dict(SETUPS[name])
+        if name == 'group':
+            options['group_commit'] = args.group
+        if name == 'async':
+            options['coroutines'] = args.coroutines
+        results.append(run_setup(name, options, args.sales, args.products, args.seed))
+
+    base = results[0]['sales_per_sec']
+    print(f"{'setup':<12}{'sales':>8}{'seconds':>10}{'sales/sec':>12}{'speedup':>9}")
+    for r in results:
+        print(f"{r['setup']:<12}{r['sales']:>8}{r['seconds']:>10.3f}{r['sales_per_sec']:>12.0f}"
+              f"{r['sales_per_sec'] / base:>8.1f}x")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
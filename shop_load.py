@@ -0,0 +1,185 @@
+"""Load test: several tills selling from one store at the same time.
+
+Each till is its own process hammering the same products. In server mode
+they go through shop_server.py (started here on a free port unless --url
+points at a running one); in direct mode each till opens the database
+itself, which is how the shop runs without the server. Afterwards the stock
+left is checked against the sales every till was told succeeded.
+
+    python shop_load.py --tills 8 --sales 500
+    python shop_load.py --mode direct --tills 8
+    python shop_load.py --url http://127.0.0.1:8765 --tills 4
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from shopapp import ShopManager, ShopPool
+
+class HttpTill:
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port)
+
+    def call(self, method, path, body=None):
+        data = None if body is None else json.dumps(body)
+        self.conn.request(method, path, body=data, headers={'Content-Type': 'application/json'})
+        response = self.conn.getresponse()
+        result = json.loads(response.read())
+        if response.status == 400:
+            raise ValueError(result['error'])
+        if response.status != 200 and response.status != 201:
+            raise RuntimeError(result['error'])
+        return result
+
+    def add_product(self, name, purchase_price, selling_price, inventory):
+        return self.call('POST', '/products', {'name': name, 'purchase_price': purchase_price,
+                                               'selling_price': selling_price, 'inventory': inventory})['id']
+
+    def inventory(self, product_id):
+        return self.call('GET', f'/products/{product_id}')['inventory']
+
+    def sell(self, product_id, quantity):
+        self.call('POST', '/sell', {'product_id': product_id, 'quantity': quantity})
+
+    def search(self, name):
+        self.call('GET', '/products?q=' + name + '&limit=20')
+
+class DirectTill:
+    def __init__(self, db_name):
+        self.manager = ShopManager(db_name)
+
+    def add_product(self, name, purchase_price, selling_price, inventory):
+        return self.manager.add_product(name, purchase_price, selling_price, inventory).id
+
+    def inventory(self, product_id):
+        return self.manager.get_product(product_id).inventory
+
+    def sell(self, product_id, quantity):
+        self.manager.sell(product_id, quantity)
+
+    def search(self, name):
+        self.manager.search_products(name, limit=20)
+
+def till(args, number, ids, barrier, results):
+    rng = random.Random(number)
+    shop = HttpTill(args.url) if args.mode == 'server' else DirectTill(args.db)
+    sold = 0  # units the store confirmed
+    ok = rejected = errors = 0
+    latencies = []
+    barrier.wait()
+    start = time.perf_counter()
+    for _ in range(args.sales):
+        if rng.random() < args.search_ratio:
+            try:
+                shop.search('product')
+            except Exception:
+                errors += 1
+            continue
+        quantity = rng.randint(1, 3)
+        t0 = time.perf_counter()
+        try:
+            shop.sell(rng.choice(ids), quantity)
+            ok += 1
+            sold += quantity
+        except ValueError:
+            rejected += 1  # out of stock
+        except Exception:
+            errors += 1  # e.g. database is locked
+        latencies.append(time.perf_counter() - t0)
+    results.put((number, time.perf_counter() - start, ok, rejected, errors, sold, latencies))
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+def run(args):
+    pool = server = None
+    if args.mode == 'server' and args.url is None:
+        from shop_server import make_server
+        pool = ShopPool(args.db, max_batch=args.max_batch)
+        server = make_server(pool, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        args.url = f'http://127.0.0.1:{server.server_port}'
+    store = HttpTill(args.url) if args.mode == 'server' else DirectTill(args.db)
+    ids = [store.add_product(f'product {i}', 10, 15, args.stock) for i in range(args.products)]
+
+    # spawn, not fork: this process may be running the server's threads
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(args.tills)
+    results = context.Queue()
+    procs = [context.Process(target=till, args=(args, n, ids, barrier, results))
+             for n in range(args.tills)]
+    for p in procs:
+        p.start()
+    reports = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    left = sum(store.inventory(product_id) for product_id in ids)
+    batches = pool.batches if pool else None
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+        pool.close()
+    confirmed = sum(r[5] for r in reports)
+    latencies = sorted(t for r in reports for t in r[6])
+    wall = max(r[1] for r in reports)
+    ok = sum(r[2] for r in reports)
+    return {
+        'mode': args.mode,
+        'tills': args.tills,
+        'seconds': wall,
+        'sales': ok,
+        'sales_per_sec': ok / wall if wall else float(ok),
+        'rejected': sum(r[3] for r in reports),
+        'errors': sum(r[4] for r in reports),
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'commits': batches,
+        # stock that vanished without a confirmed sale, or the reverse
+        'mismatch': args.products * args.stock - left - confirmed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=['server', 'direct'], default='server')
+    parser.add_argument('--url', help='use a running shop_server.py instead of starting one')
+    parser.add_argument('--db', help='database file (default: a fresh temp file)')
+    parser.add_argument('--tills', type=int, default=4)
+    parser.add_argument('--sales', type=int, default=500, help='operations per till')
+    parser.add_argument('--products', type=int, default=50)
+    parser.add_argument('--stock', type=int, default=100000, help='initial inventory per product')
+    parser.add_argument('--search-ratio', type=float, default=0.1)
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--json', help='also write the result to this file')
+    args = parser.parse_args()
+    if args.url and args.mode != 'server':
+        parser.error('--url only applies to server mode')
+
+    workdir = None
+    if args.db is None:
+        workdir = tempfile.mkdtemp(prefix='shop-load-')
+        args.db = os.path.join(workdir, 'shop.db')
+    try:
+        result = run(args)
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    for key, value in result.items():
+        print(f'{key:>14}: {value:.1f}' if isinstance(value, float) else f'{key:>14}: {value}')
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""Local HTTP front for ShopPool so several tills can share one store.
+
+Every till talks JSON to one process that owns the database:
+
+    GET  /products/<id>
+    GET  /products?q=<name>&limit=<n>&offset=<n>
+    GET  /report?start=YYYY-MM-DD&end=YYYY-MM-DD
+    GET  /low_stock?limit=<n>
+    POST /products   {"name", "purchase_price", "selling_price", "inventory"[, "reorder_level"]}
+    POST /restock    {"product_id", "amount"}
+    POST /sell       {"product_id", "quantity"}
+    POST /sell_many  {"items": [[product_id, quantity], ...]}
+
+Rejected operations (unknown product, not enough stock, ...) answer 400
+with {"error": message}.
+
+With --tcp the same store is served by an asyncio server speaking one JSON
+object per line, {"op": "sell", "args": [product_id, quantity]}, answered
+by {"result": ...} or {"error": message}; every connection is a coroutine
+on one event loop in front of AsyncShopManager.
+
+    python shop_server.py --db shop.db --port 8765
+    python shop_server.py --db shop.db --port 8766 --tcp
+"""
+import argparse
+import asyncio
+import json
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from shopapp import AsyncShopManager, Shop, ShopPool
+
+def product_json(product):
+    return {'id': product.id, 'name': product.name, 'purchase_price': str(product.purchase_price),
+            'selling_price': str(product.selling_price), 'inventory': product.inventory,
+            'reorder_level': product.reorder_level}
+
+class ShopRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, one connection per till
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    pool = None  # set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body):
+        data = json.dumps(body, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_call(self, call):
+        try:
+            status, body = call()
+        except (ValueError, KeyError, TypeError) as e:
+            status, body = 400, {'error': str(e)}
+        except Exception as e:
+            status, body = 500, {'error': str(e)}
+        self.reply(status, body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = url.path.strip('/').split('/')
+        self.handle_call(lambda: self.get(parts, query))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length)
+        path = urlsplit(self.path).path.strip('/')
+        self.handle_call(lambda: self.post(path, json.loads(raw or b'{}')))
+
+    def get(self, parts, query):
+        if parts[0] == 'products' and len(parts) == 2:
+            product = self.pool.get_product(int(parts[1]))
+            if product is None:
+                return 404, {'error': 'Product not found'}
+            return 200, product_json(product)
+        if parts == ['products']:
+            limit = int(query['limit']) if 'limit' in query else None
+            products = self.pool.search_products(query.get('q', ''), limit, int(query.get('offset', 0)))
+            return 200, [product_json(p) for p in products]
+        if parts == ['low_stock']:
+            limit = int(query['limit']) if 'limit' in query else None
+            return 200, [product_json(p) for p in self.pool.low_stock(limit)]
+        if parts == ['report']:
+            rows, quantity, revenue = self.pool.generate_sales_report(query['start'], query['end'])
+            return 200, {'rows': [{'id': r[0], 'name': r[1], 'quantity': r[2], 'revenue': r[3]}
+                                  for r in rows],
+                         'quantity': quantity, 'revenue': revenue}
+        return 404, {'error': 'Not found'}
+
+    def post(self, path, body):
+        if path == 'products':
+            level = body.get('reorder_level')
+            product = self.pool.add_product(body['name'], Decimal(str(body['purchase_price'])),
+                                            Decimal(str(body['selling_price'])), int(body['inventory']),
+                                            None if level is None else int(level))
+            return 201, product_json(product)
+        if path == 'restock':
+            self.pool.add_inventory(int(body['product_id']), int(body['amount']))
+            return 200, {'ok': True}
+        if path == 'sell':
+            self.pool.sell(int(body['product_id']), int(body['quantity']))
+            return 200, {'ok': True}
+        if path == 'sell_many':
+            failures = self.pool.sell_many((int(p), int(q)) for p, q in body['items'])
+            return 200, {'failures': failures}
+        return 404, {'error': 'Not found'}
+
+def make_server(pool, host='127.0.0.1', port=8765):
+    """HTTP server bound to host:port (0 picks a free port) answering from pool."""
+    handler = type('BoundShopRequestHandler', (ShopRequestHandler,), {'pool': pool})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+TCP_OPS = ('add_product', 'add_inventory', 'sell', 'sell_many', 'restock_many', 'set_reorder_level',
+           'get_product', 'search_products', 'generate_sales_report', 'low_stock')
+
+def tcp_json(result):
+    if isinstance(result, Shop):
+        return product_json(result)
+    if isinstance(result, list):
+        return [tcp_json(item) for item in result]
+    if isinstance(result, tuple):
+        return [tcp_json(item) for item in result]
+    return result
+
+async def handle_tcp(manager, reader, writer):
+    """Answer one line-delimited JSON client until it disconnects."""
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("Request must be a JSON object")
+                if request.get('op') not in TCP_OPS:
+                    raise ValueError(f"Unknown operation: {request.get('op')}")
+                result = await getattr(manager, request['op'])(*request.get('args', ()))
+                reply = {'result': tcp_json(result)}
+            except Exception as e:
+                # a bad request, a rejected operation or a database error:
+                # answer it and keep the connection, as HTTP does with 400/500
+                reply = {'error': str(e)}
+            writer.write(json.dumps(reply, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+            await writer.drain()
+    except (ConnectionError, ValueError):
+        pass  # client went away, or sent a line longer than the stream limit
+    finally:
+        writer.close()
+
+async def serve_tcp(manager, host='127.0.0.1', port=8766):
+    """asyncio server for AsyncShopManager manager; returns the started asyncio.Server."""
+    return await asyncio.start_server(lambda r, w: handle_tcp(manager, r, w), host, port)
+
+async def run_tcp(args):
+    async with AsyncShopManager(args.db, max_batch=args.max_batch) as manager:
+        server = await serve_tcp(manager, args.host, args.port)
+        port = server.sockets[0].getsockname()[1]
+        print(f'serving {args.db} on tcp://{args.host}:{port}')
+        async with server:
+            await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='shop.db')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch', type=int, default=256, help='writes per commit at most')
+    parser.add_argument('--tcp', action='store_true', help='serve line-delimited JSON over asyncio instead of HTTP')
+    args = parser.parse_args()
+
+    if args.tcp:
+        try:
+            asyncio.run(run_tcp(args))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    pool = ShopPool(args.db, max_batch=args.max_batch)
+    server = make_server(pool, args.host, args.port)
+    print(f'serving {args.db} on http://{args.host}:{server.server_port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,99 @@
 # filepath: c:\Users\Shayan\Desktop\Python\shopapp.py
 
+import asyncio
+import functools
+import json
+import queue
 import sqlite3
 import datetime
+import threading
+import time
+import traceback
+import weakref
 import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from decimal import ROUND_HALF_UP, Decimal
 from tkinter import messagebox, simpledialog, ttk
 
+# prices are stored as integers in the currency's minor unit
+PRICE_DIGITS = 2
+
+def to_cents(amount):
+    """Price in minor units, rounding half up; accepts int, float, str or Decimal."""
+    cents = (Decimal(str(amount)) * 10 ** PRICE_DIGITS).quantize(Decimal(1), ROUND_HALF_UP)
+    return int(cents)
+
+def from_cents(cents):
+    """Exact Decimal price for an amount in minor units."""
+    return Decimal(cents).scaleb(-PRICE_DIGITS)
+
+def _locked(method):
+    """Run a ShopManager method holding its lock, so an idle group commit can't land halfway through it."""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return locked
+
 # Class representing a product in the shop
 class Shop:
-    def __init__(self, manager, id, name, purchase_price, selling_price, inventory):
+    # a manager hands out one Shop per product id and updates it in place,
+    # so slots keep the many instances of a big catalog small
+    __slots__ = ('manager', 'id', 'name', 'purchase_cents', 'selling_cents', 'inventory',
+                 'reorder_level', '_loaded', '__weakref__')
+    FIELDS = ('name', 'purchase_cents', 'selling_cents', 'inventory', 'reorder_level')
+
+    def __init__(self, manager, id, name, purchase_cents, selling_cents, inventory, reorder_level=0):
         self.manager = manager  # Reference to ShopManager for database operations
         self.id = id
         self.name = name
-        self.purchase_price = purchase_price
-        self.selling_price = selling_price
+        self.purchase_cents = purchase_cents
+        self.selling_cents = selling_cents
         self.inventory = inventory
+        self.reorder_level = reorder_level  # stock below this counts as low
+        self._loaded = True
+
+    @classmethod
+    def stub(cls, manager, id):
+        """A product whose fields are read from the database on first use."""
+        shop = cls.__new__(cls)
+        shop.manager = manager
+        shop.id = id
+        shop._loaded = False
+        return shop
+
+    def __getattr__(self, attr):
+        # only reached for fields a stub hasn't loaded yet
+        if attr in Shop.FIELDS and not self._loaded:
+            self.manager._load(self)
+            return object.__getattribute__(self, attr)
+        raise AttributeError(attr)
+
+    def _fill(self, row):
+        _, self.name, self.purchase_cents, self.selling_cents, self.inventory, self.reorder_level = row
+        self._loaded = True
+
+    def _unload(self):
+        for field in Shop.FIELDS:
+            if hasattr(self, field):
+                object.__delattr__(self, field)
+        self._loaded = False
+
+    @property
+    def purchase_price(self):
+        return from_cents(self.purchase_cents)
+
+    @property
+    def selling_price(self):
+        return from_cents(self.selling_cents)
 
     def add_inventory(self, amount):
         """Increase inventory by the specified amount."""
         if amount < 0:
             raise ValueError("Amount to add cannot be negative")
-        self.manager.add_inventory(self.id, amount)
-        self.inventory += amount
+        self.manager.add_inventory(self.id, amount)  # updates self.inventory
 
     def sell(self, quantity):
         """Sell the specified quantity, updating inventory."""
@@ -28,15 +101,278 @@ class Shop:
             raise ValueError("Quantity to sell cannot be negative")
         if self.inventory < quantity:
             raise ValueError("Not enough inventory to sell")
-        self.manager.sell(self.id, quantity)
-        self.inventory -= quantity
+        self.manager.sell(self.id, quantity)  # updates self.inventory
+
+def _next_day(day):
+    return (datetime.date.fromisoformat(day) + datetime.timedelta(days=1)).isoformat()
+
+def _previous_day(day):
+    return (datetime.date.fromisoformat(day) - datetime.timedelta(days=1)).isoformat()
 
 # Class managing the shop's database and operations
 class ShopManager:
-    def __init__(self, db_name='shop.db'):
-        self.conn = sqlite3.connect(db_name)
+    LAZY_BATCH = 256  # stubs filled in per query
+
+    def __init__(self, db_name='shop.db', journal_mode='WAL', synchronous='NORMAL',
+                 cache_size_kb=32 * 1024, mmap_size=256 * 1024 * 1024,
+                 group_commit=1, group_commit_delay=1.0, cached_statements=256,
+                 product_cache_size=1024, check_same_thread=True,
+                 low_stock_threshold=0, on_low_stock=None):
+        """Open the database.
+
+        journal_mode, synchronous, cache_size_kb and mmap_size are applied as
+        pragmas; None leaves SQLite's own default. group_commit > 1 commits
+        once every that many writes, or group_commit_delay seconds after the
+        first uncommitted one, instead of after each one; a timer thread
+        commits for a till that has gone quiet, so the write lock is never
+        held longer than that. flush() and close() commit whatever is left.
+        cached_statements is the size of the connection's prepared-statement
+        cache. product_cache_size bounds the in-memory product cache (0
+        turns it off). check_same_thread=False lets another thread close()
+        the connection; it must still be used by one thread at a time.
+        low_stock_threshold is the reorder level given to new products (0:
+        never low). on_low_stock(product) is called once a write that takes
+        a product below its reorder level has been committed, from the
+        timer thread if that is what committed it.
+        """
+        # held by every method that touches the connection; the group commit
+        # timer is the only other thread that uses it
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_name, cached_statements=cached_statements,
+                                    check_same_thread=check_same_thread and group_commit <= 1)
         self.cursor = self.conn.cursor()
+        self.configure(journal_mode, synchronous, cache_size_kb, mmap_size)
+        self.group_commit = group_commit
+        self.group_commit_delay = group_commit_delay
+        self._pending = 0
+        self._pending_since = 0.0
+        self._timer = None
+        self._depth = 0
+        # id -> (id, name, purchase_cents, selling_cents, inventory, reorder_level),
+        # least recently used first
+        self.product_cache_size = product_cache_size
+        self._products = OrderedDict()
+        self._data_version = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.low_stock_threshold = low_stock_threshold
+        self.on_low_stock = on_low_stock
+        self._alerts = []  # ids that went low in writes not yet committed
+        # id -> the one live Shop for it; stubs waiting for their fields, oldest first
+        self._identity = weakref.WeakValueDictionary()
+        self._unloaded = OrderedDict()
         self.create_tables()
+        self._check_cache()
+
+    def configure(self, journal_mode=None, synchronous=None, cache_size_kb=None, mmap_size=None):
+        """Apply connection pragmas; arguments left as None are not touched."""
+        if journal_mode is not None:
+            # WAL lets readers carry on while a sale is being written and
+            # turns each commit into one sequential append
+            self.cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+        if synchronous is not None:
+            # NORMAL only syncs at checkpoints in WAL mode: a power cut can
+            # lose the last commits but never corrupts the database
+            self.cursor.execute(f'PRAGMA synchronous = {synchronous}')
+        if cache_size_kb is not None:
+            self.cursor.execute(f'PRAGMA cache_size = {-int(cache_size_kb)}')
+        if mmap_size is not None:
+            self.cursor.execute(f'PRAGMA mmap_size = {int(mmap_size)}')
+
+    def _commit(self):
+        """Commit a write unless a transaction() or group commit holds it back."""
+        if self._depth:
+            return
+        if self._pending == 0:
+            self._pending_since = time.monotonic()
+        self._pending += 1
+        if (self._pending >= self.group_commit
+                or time.monotonic() - self._pending_since >= self.group_commit_delay):
+            self.flush()
+        elif self._timer is None:
+            delay = self._pending_since + self.group_commit_delay - time.monotonic()
+            self._timer = threading.Timer(delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    @_locked
+    def flush(self):
+        """Commit writes held back by group commit."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending and not self._depth and self.conn is not None:
+            self.conn.commit()
+            self._pending = 0
+            self._fire_alerts()
+
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed operations as one commit, or none if one of them raises.
+
+        Nested blocks become savepoints, so an inner failure that is caught
+        doesn't undo the outer block.
+        """
+        with self._lock:
+            savepoint = f'tx{self._depth}'
+            alerts = len(self._alerts)
+            if self._depth == 0:
+                self.flush()
+                self.conn.execute('BEGIN IMMEDIATE')
+            else:
+                self.conn.execute(f'SAVEPOINT {savepoint}')
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                # cached rows and products may hold writes that are being undone
+                self._forget()
+                del self._alerts[alerts:]
+                if self._depth == 0:
+                    self.conn.rollback()
+                else:
+                    self.conn.execute(f'ROLLBACK TO {savepoint}')
+                    self.conn.execute(f'RELEASE {savepoint}')
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self.conn.commit()
+                self._fire_alerts()
+            else:
+                self.conn.execute(f'RELEASE {savepoint}')
+
+    def _note_stock(self, product_id, before, after, level):
+        """Remember a product whose stock just went from level or more to below it."""
+        if after < level <= before:
+            self._alerts.append(product_id)
+
+    def _fire_alerts(self):
+        alerts, self._alerts = self._alerts, []
+        if self.on_low_stock is None:
+            return
+        for product_id in dict.fromkeys(alerts):
+            product = self.get_product(product_id)
+            if product is None or product.inventory >= product.reorder_level:
+                continue  # restocked since
+            try:
+                self.on_low_stock(product)
+            except Exception:
+                # the write is committed; a failing handler mustn't look like it wasn't
+                traceback.print_exc()
+
+    def _check_cache(self):
+        """Drop the product cache if another connection has committed since."""
+        if self._depth:
+            return  # BEGIN IMMEDIATE keeps other writers out
+        self.cursor.execute('PRAGMA data_version')
+        version = self.cursor.fetchone()[0]
+        if version != self._data_version:
+            self._forget()
+            self._data_version = version
+
+    def _forget(self):
+        """Drop cached rows and make live products reload their fields."""
+        self._products.clear()
+        for shop in list(self._identity.values()):
+            if shop._loaded:
+                shop._unload()
+                self._pend(shop.id)
+
+    def _shop(self, row):
+        """The product's one Shop, created or brought up to date from row."""
+        shop = self._identity.get(row[0])
+        if shop is None:
+            shop = Shop(self, *row)
+            self._identity[row[0]] = shop
+        else:
+            shop._fill(row)
+            self._unloaded.pop(row[0], None)
+        return shop
+
+    def _stub(self, product_id):
+        shop = self._identity.get(product_id)
+        if shop is None:
+            shop = Shop.stub(self, product_id)
+            self._identity[product_id] = shop
+            self._pend(product_id)
+        return shop
+
+    def _pend(self, product_id):
+        # stubs dropped before they were loaded leave their ids behind; sweep
+        # those out once they make up more than half of the queue
+        self._unloaded[product_id] = None
+        if len(self._unloaded) > 2 * len(self._identity) + self.LAZY_BATCH:
+            for stale in [i for i in self._unloaded if i not in self._identity]:
+                del self._unloaded[stale]
+
+    def _refresh(self, product_id, **fields):
+        """Apply a write to the product's live Shop, if it has one with fields loaded."""
+        shop = self._identity.get(product_id)
+        if shop is not None and shop._loaded:
+            for field, value in fields.items():
+                setattr(shop, field, value)
+
+    @_locked
+    def _load(self, shop):
+        """Fill in a stub, and the stubs created after it, with one query."""
+        self._unloaded.pop(shop.id, None)
+        ids = [shop.id]
+        while self._unloaded and len(ids) < self.LAZY_BATCH:
+            product_id, _ = self._unloaded.popitem(last=False)
+            if product_id in self._identity:  # else the stub is gone
+                ids.append(product_id)
+        self.cursor.execute('''
+            SELECT id, name, purchase_cents, selling_cents, inventory, reorder_level FROM products
+            WHERE id IN (SELECT value FROM json_each(?))
+        ''', (json.dumps(ids),))
+        for row in self.cursor.fetchall():
+            self._shop(row)
+        if not shop._loaded:
+            raise ValueError("Product not found")
+
+    def _cache_put(self, row):
+        if self.product_cache_size <= 0:
+            return
+        self._products[row[0]] = row
+        self._products.move_to_end(row[0])
+        if len(self._products) > self.product_cache_size:
+            self._products.popitem(last=False)
+
+    def _cache_inventory(self, product_id, inventory):
+        """Record a new inventory for a product if it is cached."""
+        row = self._products.get(product_id)
+        if row is not None:
+            self._products[product_id] = row[:4] + (inventory,) + row[5:]
+
+    def _product_row(self, product_id):
+        """Row of a product from the cache, or the database on a miss; None if unknown."""
+        self._check_cache()
+        row = self._products.get(product_id)
+        if row is not None:
+            self.cache_hits += 1
+            self._products.move_to_end(product_id)
+            return row
+        self.cache_misses += 1
+        self.cursor.execute('''
+            SELECT id, name, purchase_cents, selling_cents, inventory, reorder_level
+            FROM products WHERE id = ?
+        ''', (product_id,))
+        row = self.cursor.fetchone()
+        if row is not None:
+            self._cache_put(row)
+        return row
+
+    @_locked
+    def get_product(self, product_id):
+        """Return the product with this id, or None."""
+        row = self._product_row(product_id)
+        return self._shop(row) if row else None
+
+    def cache_info(self):
+        """Hit/miss counters and size of the product cache."""
+        return {'hits': self.cache_hits, 'misses': self.cache_misses,
+                'size': len(self._products), 'max_size': self.product_cache_size}
 
     def create_tables(self):
         """Create products and sales tables if they don't exist."""
@@ -44,83 +380,732 @@ class ShopManager:
             CREATE TABLE IF NOT EXISTS products (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT NOT NULL,
-                purchase_price REAL NOT NULL,
-                selling_price REAL NOT NULL,
-                inventory INTEGER NOT NULL
+                purchase_cents INTEGER NOT NULL,
+                selling_cents INTEGER NOT NULL,
+                inventory INTEGER NOT NULL,
+                reorder_level INTEGER NOT NULL DEFAULT 0
             )
         ''')
+        # unit_cents is the selling price at the time of the sale
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS sales (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 product_id INTEGER NOT NULL,
                 quantity INTEGER NOT NULL,
+                unit_cents INTEGER NOT NULL,
                 timestamp TEXT NOT NULL,
                 FOREIGN KEY (product_id) REFERENCES products (id)
             )
         ''')
+        self.cursor.execute('SELECT name FROM pragma_table_info(?)', ('products',))
+        if 'purchase_price' in {row[0] for row in self.cursor.fetchall()}:
+            self._migrate_to_cents()
+        self.cursor.execute('SELECT name FROM pragma_table_info(?)', ('products',))
+        if 'reorder_level' not in {row[0] for row in self.cursor.fetchall()}:
+            self.cursor.execute('ALTER TABLE products ADD COLUMN reorder_level INTEGER NOT NULL DEFAULT 0')
+        # holds only the products that are low, so low_stock() reads just those
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_products_low_stock ON products (inventory)
+            WHERE inventory < reorder_level
+        ''')
+        # ranged reports seek here instead of scanning every sale ever made
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_sales_timestamp ON sales (timestamp, product_id)
+        ''')
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_sales'")
+        backfill = self.cursor.fetchone() is None
+        # quantity and revenue per product per day, kept current by the triggers below
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS daily_sales (
+                day TEXT NOT NULL,
+                product_id INTEGER NOT NULL,
+                quantity INTEGER NOT NULL,
+                revenue_cents INTEGER NOT NULL,
+                PRIMARY KEY (day, product_id)
+            ) WITHOUT ROWID
+        ''')
+        self.cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS sales_rollup_insert AFTER INSERT ON sales
+            BEGIN
+                INSERT INTO daily_sales (day, product_id, quantity, revenue_cents)
+                VALUES (substr(NEW.timestamp, 1, 10), NEW.product_id, NEW.quantity,
+                        NEW.quantity * NEW.unit_cents)
+                ON CONFLICT (day, product_id) DO UPDATE SET
+                    quantity = quantity + excluded.quantity,
+                    revenue_cents = revenue_cents + excluded.revenue_cents;
+            END
+        ''')
+        self.cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS sales_rollup_delete AFTER DELETE ON sales
+            BEGIN
+                UPDATE daily_sales SET quantity = quantity - OLD.quantity,
+                    revenue_cents = revenue_cents - OLD.quantity * OLD.unit_cents
+                WHERE day = substr(OLD.timestamp, 1, 10) AND product_id = OLD.product_id;
+            END
+        ''')
+        # trigram FTS index behind search_products(); fall back to LIKE when
+        # the sqlite build has no FTS5
+        try:
+            self.cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'")
+            new_fts = self.cursor.fetchone() is None
+            self.cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+                    name, content='products', content_rowid='id', tokenize='trigram'
+                )
+            ''')
+            # only a rename touches the index, not every inventory change
+            self.conn.executescript('''
+                CREATE TRIGGER IF NOT EXISTS products_ai AFTER INSERT ON products BEGIN
+                    INSERT INTO products_fts (rowid, name) VALUES (new.id, new.name);
+                END;
+                CREATE TRIGGER IF NOT EXISTS products_ad AFTER DELETE ON products BEGIN
+                    INSERT INTO products_fts (products_fts, rowid, name) VALUES ('delete', old.id, old.name);
+                END;
+                CREATE TRIGGER IF NOT EXISTS products_au AFTER UPDATE OF name ON products BEGIN
+                    INSERT INTO products_fts (products_fts, rowid, name) VALUES ('delete', old.id, old.name);
+                    INSERT INTO products_fts (rowid, name) VALUES (new.id, new.name);
+                END;
+            ''')
+            if new_fts:
+                self.cursor.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+            self._fts = True
+        except sqlite3.OperationalError:
+            self._fts = False
+        if backfill:
+            # databases from before the rollup existed
+            self.cursor.execute('''
+                INSERT INTO daily_sales (day, product_id, quantity, revenue_cents)
+                SELECT substr(timestamp, 1, 10), product_id, SUM(quantity), SUM(quantity * unit_cents)
+                FROM sales GROUP BY substr(timestamp, 1, 10), product_id
+            ''')
         self.conn.commit()
 
-    def add_product(self, name, purchase_price, selling_price, inventory):
-        """Add a new product to the database."""
-        if purchase_price < 0 or selling_price < 0 or inventory < 0:
+    def _migrate_to_cents(self):
+        """Convert a database with REAL prices to integer minor units.
+
+        Old sales get the product's current selling price, which is what
+        reports used to multiply them by.
+        """
+        scale = 10 ** PRICE_DIGITS
+        with self.transaction():
+            self.cursor.execute('''
+                CREATE TABLE products_cents (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    purchase_cents INTEGER NOT NULL,
+                    selling_cents INTEGER NOT NULL,
+                    inventory INTEGER NOT NULL
+                )
+            ''')
+            self.cursor.execute(f'''
+                INSERT INTO products_cents (id, name, purchase_cents, selling_cents, inventory)
+                SELECT id, name, CAST(round(purchase_price * {scale}) AS INTEGER),
+                       CAST(round(selling_price * {scale}) AS INTEGER), inventory
+                FROM products
+            ''')
+            # keep ids of deleted products from being handed out again
+            self.cursor.execute('''
+                UPDATE sqlite_sequence SET seq = (SELECT seq FROM sqlite_sequence WHERE name = 'products')
+                WHERE name = 'products_cents'
+            ''')
+            self.cursor.execute('DROP TABLE products')
+            self.cursor.execute('ALTER TABLE products_cents RENAME TO products')
+            self.cursor.execute('SELECT name FROM pragma_table_info(?)', ('sales',))
+            if 'unit_cents' not in {row[0] for row in self.cursor.fetchall()}:
+                self.cursor.execute('ALTER TABLE sales ADD COLUMN unit_cents INTEGER NOT NULL DEFAULT 0')
+                self.cursor.execute('''
+                    UPDATE sales SET unit_cents = coalesce(
+                        (SELECT selling_cents FROM products WHERE products.id = sales.product_id), 0)
+                ''')
+            # the rollup and its triggers are recreated with revenue by create_tables
+            self.cursor.execute('DROP TRIGGER IF EXISTS sales_rollup_insert')
+            self.cursor.execute('DROP TRIGGER IF EXISTS sales_rollup_delete')
+            self.cursor.execute('DROP TABLE IF EXISTS daily_sales')
+
+    @_locked
+    def add_product(self, name, purchase_price, selling_price, inventory, reorder_level=None):
+        """Add a new product to the database; prices are rounded to whole minor units.
+
+        reorder_level defaults to the manager's low_stock_threshold.
+        """
+        purchase_cents, selling_cents = to_cents(purchase_price), to_cents(selling_price)
+        if reorder_level is None:
+            reorder_level = self.low_stock_threshold
+        if purchase_cents < 0 or selling_cents < 0 or inventory < 0 or reorder_level < 0:
             raise ValueError("Prices and inventory must be non-negative")
         self.cursor.execute('''
-            INSERT INTO products (name, purchase_price, selling_price, inventory)
-            VALUES (?, ?, ?, ?)
-        ''', (name, purchase_price, selling_price, inventory))
-        self.conn.commit()
+            INSERT INTO products (name, purchase_cents, selling_cents, inventory, reorder_level)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (name, purchase_cents, selling_cents, inventory, reorder_level))
         product_id = self.cursor.lastrowid
-        return Shop(self, product_id, name, purchase_price, selling_price, inventory)
+        row = (product_id, name, purchase_cents, selling_cents, inventory, reorder_level)
+        self._commit()
+        self._cache_put(row)
+        return self._shop(row)
+
+    @_locked
+    def set_reorder_level(self, product_id, reorder_level):
+        """Change the stock level below which a product counts as low."""
+        if reorder_level < 0:
+            raise ValueError("Reorder level cannot be negative")
+        self.cursor.execute('UPDATE products SET reorder_level = ? WHERE id = ?', (reorder_level, product_id))
+        if self.cursor.rowcount != 1:
+            raise ValueError("Product not found")
+        self._products.pop(product_id, None)
+        self._refresh(product_id, reorder_level=reorder_level)
+        self._commit()
+
+    @_locked
+    def low_stock(self, limit=None):
+        """Products below their reorder level, lowest stock first.
 
+        Reads the partial index of low products, so the cost follows the
+        number of results rather than the size of the catalog.
+        """
+        self.cursor.execute('''
+            SELECT id, name, purchase_cents, selling_cents, inventory, reorder_level
+            FROM products INDEXED BY idx_products_low_stock
+            WHERE inventory < reorder_level
+            ORDER BY inventory
+            LIMIT ?
+        ''', (-1 if limit is None else limit,))
+        return [self._shop(row) for row in self.cursor.fetchall()]
+
+    @_locked
     def add_inventory(self, product_id, amount):
         """Increase inventory for a product."""
-        self.cursor.execute('SELECT id FROM products WHERE id = ?', (product_id,))
-        if not self.cursor.fetchone():
+        if amount < 0:
+            raise ValueError("Amount to add cannot be negative")
+        row = self._product_row(product_id)
+        if not row:
             raise ValueError("Product not found")
         self.cursor.execute('''
             UPDATE products SET inventory = inventory + ? WHERE id = ?
         ''', (amount, product_id))
-        self.conn.commit()
+        self._cache_inventory(product_id, row[4] + amount)
+        self._refresh(product_id, inventory=row[4] + amount)
+        self._commit()
 
+    @_locked
     def sell(self, product_id, quantity):
         """Record a sale and update inventory."""
-        self.cursor.execute('SELECT inventory FROM products WHERE id = ?', (product_id,))
-        result = self.cursor.fetchone()
-        if not result:
+        if quantity < 0:
+            raise ValueError("Quantity to sell cannot be negative")
+        row = self._product_row(product_id)
+        if not row:
             raise ValueError("Product not found")
-        if result[0] < quantity:
+        if row[4] < quantity:
+            raise ValueError("Not enough inventory")
+        # the stock condition guards against a cached row that has gone stale
+        self.cursor.execute('UPDATE products SET inventory = inventory - ? WHERE id = ? AND inventory >= ?',
+                           (quantity, product_id, quantity))
+        if self.cursor.rowcount != 1:
+            self._products.pop(product_id, None)
             raise ValueError("Not enough inventory")
-        self.cursor.execute('UPDATE products SET inventory = inventory - ? WHERE id = ?', 
-                           (quantity, product_id))
+        self._cache_inventory(product_id, row[4] - quantity)
+        self._refresh(product_id, inventory=row[4] - quantity)
+        self._note_stock(product_id, row[4], row[4] - quantity, row[5])
         timestamp = datetime.datetime.now().isoformat()
-        self.cursor.execute('INSERT INTO sales (product_id, quantity, timestamp) VALUES (?, ?, ?)',
-                           (product_id, quantity, timestamp))
-        self.conn.commit()
+        self.cursor.execute('INSERT INTO sales (product_id, quantity, unit_cents, timestamp) VALUES (?, ?, ?, ?)',
+                           (product_id, quantity, row[3], timestamp))
+        self._commit()
 
-    def search_products(self, name):
-        """Search for products by name."""
+    def _inventories(self, product_ids):
+        """Inventory, selling price and reorder level by product id, in one query."""
         self.cursor.execute('''
-            SELECT id, name, purchase_price, selling_price, inventory
-            FROM products WHERE name LIKE ?
-        ''', ('%' + name + '%',))
-        return [Shop(self, *row) for row in self.cursor.fetchall()]
+            SELECT id, inventory, selling_cents, reorder_level FROM products
+            WHERE id IN (SELECT value FROM json_each(?))
+        ''', (json.dumps(sorted(set(product_ids))),))
+        rows = self.cursor.fetchall()
+        return ({row[0]: row[1] for row in rows}, {row[0]: row[2] for row in rows},
+                {row[0]: row[3] for row in rows})
+
+    @_locked
+    def sell_many(self, items):
+        """Record many (product_id, quantity) sales in one transaction.
+
+        Items are checked in order against the stock left by the ones before
+        them. Those that can't be sold are skipped and returned as
+        (index, product_id, quantity, reason) tuples; the rest go through.
+        """
+        items = list(items)
+        failures = []
+        with self.transaction():
+            stock, prices, levels = self._inventories(product_id for product_id, _ in items)
+            totals = {}
+            sold = []
+            for index, (product_id, quantity) in enumerate(items):
+                if quantity < 0:
+                    failures.append((index, product_id, quantity, "Quantity to sell cannot be negative"))
+                elif product_id not in stock:
+                    failures.append((index, product_id, quantity, "Product not found"))
+                elif stock[product_id] < quantity:
+                    failures.append((index, product_id, quantity, "Not enough inventory"))
+                else:
+                    stock[product_id] -= quantity
+                    totals[product_id] = totals.get(product_id, 0) + quantity
+                    sold.append((product_id, quantity))
+            self.cursor.executemany('UPDATE products SET inventory = inventory - ? WHERE id = ?',
+                                    [(total, product_id) for product_id, total in totals.items()])
+            for product_id, total in totals.items():
+                self._cache_inventory(product_id, stock[product_id])
+                self._refresh(product_id, inventory=stock[product_id])
+                self._note_stock(product_id, stock[product_id] + total, stock[product_id], levels[product_id])
+            timestamp = datetime.datetime.now().isoformat()
+            self.cursor.executemany('INSERT INTO sales (product_id, quantity, unit_cents, timestamp) VALUES (?, ?, ?, ?)',
+                                    [(product_id, quantity, prices[product_id], timestamp)
+                                     for product_id, quantity in sold])
+        return failures
+
+    @_locked
+    def restock_many(self, items):
+        """Add inventory for many (product_id, amount) pairs in one transaction.
+
+        Returns the skipped items as (index, product_id, amount, reason).
+        """
+        items = list(items)
+        failures = []
+        with self.transaction():
+            stock, _, _ = self._inventories(product_id for product_id, _ in items)
+            totals = {}
+            for index, (product_id, amount) in enumerate(items):
+                if amount < 0:
+                    failures.append((index, product_id, amount, "Amount to add cannot be negative"))
+                elif product_id not in stock:
+                    failures.append((index, product_id, amount, "Product not found"))
+                else:
+                    totals[product_id] = totals.get(product_id, 0) + amount
+            self.cursor.executemany('UPDATE products SET inventory = inventory + ? WHERE id = ?',
+                                    [(total, product_id) for product_id, total in totals.items()])
+            for product_id, total in totals.items():
+                self._cache_inventory(product_id, stock[product_id] + total)
+                self._refresh(product_id, inventory=stock[product_id] + total)
+        return failures
+
+    @_locked
+    def search_products(self, name, limit=None, offset=0, lazy=False):
+        """Search for products by name, best matches first.
+
+        limit and offset page through the results; limit=None returns all.
+        With lazy=True only the matching ids are read; each product's
+        fields are loaded on first use, LAZY_BATCH products per query.
+        """
+        limit = -1 if limit is None else limit
+        # fixed SQL text so the connection's statement cache is reused
+        if self._fts and len(name) >= 3:
+            # trigrams need at least three characters
+            phrase = '"' + name.replace('"', '""') + '"'
+            if lazy:
+                self.cursor.execute('''
+                    SELECT rowid FROM products_fts WHERE products_fts MATCH ?
+                    ORDER BY rank, rowid
+                    LIMIT ? OFFSET ?
+                ''', (phrase, limit, offset))
+            else:
+                self.cursor.execute('''
+                    SELECT p.id, p.name, p.purchase_cents, p.selling_cents, p.inventory, p.reorder_level
+                    FROM products_fts f JOIN products p ON p.id = f.rowid
+                    WHERE products_fts MATCH ?
+                    ORDER BY f.rank, p.id
+                    LIMIT ? OFFSET ?
+                ''', (phrase, limit, offset))
+        else:
+            pattern = name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            if lazy:
+                self.cursor.execute(r'''
+                    SELECT id FROM products WHERE name LIKE ? ESCAPE '\'
+                    ORDER BY name NOT LIKE ? ESCAPE '\', length(name), id
+                    LIMIT ? OFFSET ?
+                ''', ('%' + pattern + '%', pattern + '%', limit, offset))
+            else:
+                self.cursor.execute(r'''
+                    SELECT id, name, purchase_cents, selling_cents, inventory, reorder_level
+                    FROM products WHERE name LIKE ? ESCAPE '\'
+                    ORDER BY name NOT LIKE ? ESCAPE '\', length(name), id
+                    LIMIT ? OFFSET ?
+                ''', ('%' + pattern + '%', pattern + '%', limit, offset))
+        if lazy:
+            return [self._stub(row[0]) for row in self.cursor.fetchall()]
+        return [self._shop(row) for row in self.cursor.fetchall()]
 
+    @_locked
     def generate_sales_report(self, start_date, end_date):
-        """Generate a sales report for a specific period."""
-        self.cursor.execute('''
-            SELECT p.id, p.name, SUM(s.quantity), SUM(s.quantity * p.selling_price)
-            FROM sales s JOIN products p ON s.product_id = p.id
-            WHERE s.timestamp >= ? AND s.timestamp <= ?
-            GROUP BY p.id, p.name
-        ''', (start_date, end_date + ' 23:59:59'))
-        results = self.cursor.fetchall()
-        total_quantity = sum(row[2] for row in results)
-        total_revenue = sum(row[3] for row in results)
+        """Generate a sales report for a specific period.
+
+        Dates are YYYY-MM-DD and both days are included. Either end may also
+        carry a time (YYYY-MM-DD HH:MM[:SS]); whole days are read from the
+        daily_sales rollup and only the partial days from the sales rows.
+        Revenue uses the price each sale was made at and is an exact Decimal.
+        """
+        # timestamps are stored by isoformat(), with a 'T' between date and time;
+        # 'T99' sorts after every time of that day
+        start = start_date.strip().replace(' ', 'T')
+        end = end_date.strip().replace(' ', 'T')
+        first_day, last_day = start[:10], end[:10]
+        parts = []
+        params = []
+        if len(start) > 10:
+            # partial first day, up to its midnight or the end time
+            first_day = _next_day(first_day)
+            parts.append('SELECT product_id, quantity, quantity * unit_cents AS revenue_cents FROM sales WHERE timestamp >= ? AND timestamp <= ?')
+            params += [start, min(end if len(end) > 10 else end + 'T99', start[:10] + 'T99')]
+        if len(end) > 10 and end[:10] >= first_day:
+            last_day = _previous_day(last_day)
+            parts.append('SELECT product_id, quantity, quantity * unit_cents AS revenue_cents FROM sales WHERE timestamp >= ? AND timestamp <= ?')
+            params += [end[:10], end]
+        if first_day <= last_day:
+            parts.append('SELECT product_id, quantity, revenue_cents FROM daily_sales WHERE day >= ? AND day <= ?')
+            params += [first_day, last_day]
+        if not parts:
+            return [], 0, from_cents(0)
+        # integer sums first; products is only joined for the names
+        self.cursor.execute(f'''
+            SELECT t.product_id, p.name, t.quantity, t.revenue_cents
+            FROM (
+                SELECT product_id, SUM(quantity) AS quantity, SUM(revenue_cents) AS revenue_cents
+                FROM ({' UNION ALL '.join(parts)})
+                GROUP BY product_id
+                HAVING SUM(quantity) > 0
+            ) t LEFT JOIN products p ON p.id = t.product_id
+            ORDER BY t.product_id
+        ''', params)
+        rows = self.cursor.fetchall()
+        results = [(product_id, name, quantity, from_cents(cents)) for product_id, name, quantity, cents in rows]
+        total_quantity = sum(row[2] for row in rows)
+        total_revenue = from_cents(sum(row[3] for row in rows))
         return results, total_quantity, total_revenue
 
+    @_locked
+    def close(self):
+        """Commit anything pending and close the connection."""
+        if self.conn is not None:
+            self.flush()
+            self.conn.close()
+            self.conn = None
+
     def __del__(self):
         """Close the database connection when the object is destroyed."""
-        self.conn.close()
+        self.close()
+
+# Thread-safe front for several tills sharing one database
+class ShopPool:
+    WRITES = ('add_product', 'add_inventory', 'sell', 'sell_many', 'restock_many', 'set_reorder_level')
+
+    def __init__(self, db_name='shop.db', max_batch=256, **options):
+        """Share one database between threads.
+
+        Writes go through a queue to a single writer thread, which runs
+        whatever has queued up (at most max_batch operations) as one
+        transaction with a savepoint per operation, so a failed sale doesn't
+        undo the others. Reads borrow a connection from a pool that grows to
+        the number of threads reading at once, so they run concurrently
+        under WAL. options are passed to ShopManager.
+        """
+        self.db_name = db_name
+        self.max_batch = max_batch
+        self.options = options
+        self._queue = queue.Queue()
+        self._closed = False
+        self._queue_lock = threading.Lock()  # no job is queued behind the stop marker
+        self._readers = []
+        self._idle = []
+        self._readers_lock = threading.Lock()
+        # id -> the one Shop the pool hands out for it, kept current like ShopManager's
+        self._identity = weakref.WeakValueDictionary()
+        self._identity_lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+        started = Future()
+        self._writer = threading.Thread(target=self._write_loop, args=(started,),
+                                        name='shop-writer', daemon=True)
+        self._writer.start()
+        started.result()  # the schema exists before any reader opens
+
+    def _write_loop(self, started):
+        try:
+            manager = ShopManager(self.db_name, **self.options)
+        except BaseException as e:
+            started.set_exception(e)
+            return
+        started.set_result(None)
+        # a job is (calls, done): done gets one (result, error) per call
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            jobs = [job]
+            count = len(job[0])
+            while count < self.max_batch:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self._queue.put(None)  # stop after this batch
+                    break
+                jobs.append(job)
+                count += len(job[0])
+            outcomes = []
+            try:
+                with manager.transaction():
+                    for calls, _ in jobs:
+                        results = []
+                        for name, args in calls:
+                            try:
+                                with manager.transaction():
+                                    results.append((self._own(getattr(manager, name)(*args)), None))
+                            except Exception as e:
+                                results.append((None, e))
+                        outcomes.append(results)
+            except Exception as e:
+                # the commit itself failed: nothing in the batch was written
+                outcomes = [[(None, e)] * len(calls) for calls, _ in jobs]
+            self.batches += 1
+            self.writes += count
+            # only answer once the batch is committed
+            for (_, done), results in zip(jobs, outcomes):
+                done(results)
+        manager.close()
+
+    def _own(self, result):
+        # products handed out are the pool's own and write back through it,
+        # not through the connection that happened to read them
+        if isinstance(result, Shop):
+            return self._canonical(result)
+        if isinstance(result, list):
+            return [self._canonical(item) if isinstance(item, Shop) else item for item in result]
+        return result
+
+    def _canonical(self, fresh):
+        row = (fresh.id,) + tuple(getattr(fresh, field) for field in Shop.FIELDS)
+        with self._identity_lock:
+            shop = self._identity.get(fresh.id)
+            if shop is None:
+                shop = Shop(self, *row)
+                self._identity[fresh.id] = shop
+            else:
+                shop._fill(row)
+        return shop
+
+    def _refresh(self, product_ids):
+        """Re-read products the pool has handed out after a write to them."""
+        with self._identity_lock:
+            ids = [product_id for product_id in product_ids if product_id in self._identity]
+        for product_id in dict.fromkeys(ids):
+            self.get_product(product_id)
+
+    def submit(self, name, *args):
+        """Queue a write by method name; returns a Future for its result."""
+        future = Future()
+
+        def done(results):
+            result, error = results[0]
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+        self.submit_many([(name, args)], done)
+        return future
+
+    def submit_many(self, calls, done):
+        """Queue several (method name, args) writes as one job.
+
+        They are committed in the same batch; done is then called from the
+        writer thread with a (result, error) pair per call.
+        """
+        calls = list(calls)
+        for name, _ in calls:
+            if name not in self.WRITES:
+                raise ValueError(f"Not a write operation: {name}")
+        with self._queue_lock:
+            if self._closed:
+                raise RuntimeError("ShopPool is closed")
+            self._queue.put((calls, done))
+
+    def _write(self, name, *args):
+        return self.submit(name, *args).result()
+
+    def add_product(self, name, purchase_price, selling_price, inventory, reorder_level=None):
+        return self._write('add_product', name, purchase_price, selling_price, inventory, reorder_level)
+
+    def add_inventory(self, product_id, amount):
+        self._write('add_inventory', product_id, amount)
+        self._refresh([product_id])
+
+    def sell(self, product_id, quantity):
+        self._write('sell', product_id, quantity)
+        self._refresh([product_id])
+
+    def sell_many(self, items):
+        items = list(items)
+        failures = self._write('sell_many', items)
+        self._refresh(product_id for product_id, _ in items)
+        return failures
+
+    def restock_many(self, items):
+        items = list(items)
+        failures = self._write('restock_many', items)
+        self._refresh(product_id for product_id, _ in items)
+        return failures
+
+    def set_reorder_level(self, product_id, reorder_level):
+        self._write('set_reorder_level', product_id, reorder_level)
+        self._refresh([product_id])
+
+    @contextmanager
+    def reader(self):
+        """Borrow an idle read connection, opening one if none is free."""
+        with self._readers_lock:
+            manager = self._idle.pop() if self._idle else None
+        if manager is None:
+            manager = ShopManager(self.db_name, check_same_thread=False, **self.options)
+            with self._readers_lock:
+                self._readers.append(manager)
+        try:
+            yield manager
+        finally:
+            with self._readers_lock:
+                self._idle.append(manager)
+
+    def get_product(self, product_id):
+        with self.reader() as manager:
+            return self._own(manager.get_product(product_id))
+
+    def search_products(self, name, limit=None, offset=0):
+        with self.reader() as manager:
+            return self._own(manager.search_products(name, limit, offset))
+
+    def generate_sales_report(self, start_date, end_date):
+        with self.reader() as manager:
+            return manager.generate_sales_report(start_date, end_date)
+
+    def low_stock(self, limit=None):
+        with self.reader() as manager:
+            return self._own(manager.low_stock(limit))
+
+    def close(self):
+        """Finish queued writes, stop the writer and close every connection.
+
+        Writes submitted afterwards raise RuntimeError.
+        """
+        with self._queue_lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+        self._writer.join()
+        with self._readers_lock:
+            for manager in self._readers:
+                manager.close()
+            self._readers = []
+            self._idle = []
+
+# asyncio front end: coroutines await the pool's threads instead of blocking the loop
+class AsyncShopManager:
+    def __init__(self, db_name='shop.db', readers=4, pool=None, **options):
+        """Awaitable versions of the ShopManager operations.
+
+        Writes are queued to the ShopPool writer thread, which commits
+        whatever has piled up as one batch, so many coroutines selling at
+        once share commits. Reads run on up to `readers` threads. Pass an
+        existing pool to share it with threaded code; options go to
+        ShopPool otherwise.
+        """
+        self.pool = pool if pool is not None else ShopPool(db_name, **options)
+        self._owns_pool = pool is None
+        self._executor = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='shop-reader')
+        self._outbox = []  # (name, args, asyncio future) waiting for the next dispatch
+
+    def _dispatch(self):
+        # everything queued during this pass of the event loop goes to the
+        # writer as one job, and comes back in one wake-up of the loop
+        outbox, self._outbox = self._outbox, []
+        loop = asyncio.get_running_loop()
+
+        def resolve(results):
+            for (_, _, future), (result, error) in zip(outbox, results):
+                if future.cancelled():
+                    continue
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+        try:
+            self.pool.submit_many([(name, args) for name, args, _ in outbox],
+                                  lambda results: loop.call_soon_threadsafe(resolve, results))
+        except Exception as e:
+            resolve([(None, e)] * len(outbox))
+
+    async def _write(self, name, *args):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._outbox:
+            loop.call_soon(self._dispatch)
+        self._outbox.append((name, args, future))
+        return await future
+
+    async def _read(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def _refresh(self, product_ids):
+        # only worth a trip to a reader thread if a written product has been handed out
+        if any(product_id in self.pool._identity for product_id in product_ids):
+            await self._read(self.pool._refresh, product_ids)
+
+    async def add_product(self, name, purchase_price, selling_price, inventory, reorder_level=None):
+        return await self._write('add_product', name, purchase_price, selling_price, inventory, reorder_level)
+
+    async def add_inventory(self, product_id, amount):
+        await self._write('add_inventory', product_id, amount)
+        await self._refresh([product_id])
+
+    async def sell(self, product_id, quantity):
+        await self._write('sell', product_id, quantity)
+        await self._refresh([product_id])
+
+    async def sell_many(self, items):
+        items = list(items)
+        failures = await self._write('sell_many', items)
+        await self._refresh([product_id for product_id, _ in items])
+        return failures
+
+    async def restock_many(self, items):
+        items = list(items)
+        failures = await self._write('restock_many', items)
+        await self._refresh([product_id for product_id, _ in items])
+        return failures
+
+    async def set_reorder_level(self, product_id, reorder_level):
+        await self._write('set_reorder_level', product_id, reorder_level)
+        await self._refresh([product_id])
+
+    async def get_product(self, product_id):
+        return await self._read(self.pool.get_product, product_id)
+
+    async def search_products(self, name, limit=None, offset=0):
+        return await self._read(self.pool.search_products, name, limit, offset)
+
+    async def generate_sales_report(self, start_date, end_date):
+        return await self._read(self.pool.generate_sales_report, start_date, end_date)
+
+    async def low_stock(self, limit=None):
+        return await self._read(self.pool.low_stock, limit)
+
+    async def close(self):
+        """Wait for queued writes and release the reader threads.
+
+        The pool is closed too if this manager created it; a pool passed in
+        is left running for the code that shares it.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown)
+        if self._owns_pool:
+            await loop.run_in_executor(None, self.pool.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
 
 # Text-based User Interface
 def text_ui(manager):
@@ -226,7 +1211,7 @@ class ShopApp:
     def search_products(self):
         name = simpledialog.askstring("ورودی", "نام کالا برای جستجو:")
         if name:
-            products = self.manager.search_products(name)
+            products = self.manager.search_products(name, limit=500)
             search_win = tk.Toplevel(self.root)
             search_win.title("نتایج جستجو")
             tree = ttk.Treeview(search_win, columns=("ID", "Name", "Inventory"), show="headings")